@@ -13,6 +13,7 @@ from src.blocks.block import Block
 from src.plots.plot import Plot
 from src.simulation.simulation import Simulation
 from src.utils.criteria import Criteria
+from src.world import sender, shadow
 
 
 @click.command()
@@ -28,22 +29,27 @@ from src.utils.criteria import Criteria
               help='Show time taken during generation')
 @click.option('--profile-time', default=False, is_flag=True, type=bool, show_default=True,
               help='Show time profiling and output profiling file')
+@click.option('--exhaustive-placement', default=False, is_flag=True, type=bool, show_default=True,
+              help='Try every position and rotation of the build area when placing buildings, instead of random samples')
 def prepare_environment(debug: bool, tick_speed: int, no_buffering: bool, tp: bool, drops: bool, years: int,
-                        deterioration: int, auto_build_area: bool, show_time: bool, profile_time: bool) -> None:
+                        deterioration: int, auto_build_area: bool, show_time: bool, profile_time: bool,
+                        exhaustive_placement: bool) -> None:
     """Prepare the environment using CLI options"""
     env.DEBUG = debug
     env.TP = tp
     env.DETERIORATION = deterioration
     env.SHOW_TIME = show_time
     env.PROFILE_TIME = profile_time
+    env.EXHAUSTIVE_PLACEMENT = exhaustive_placement
 
     env.BUILD_AREA = env.get_build_area(auto_build_area)
-    env.WORLD = env.get_world_slice()
+    env.load_world()
 
     if auto_build_area:
         env.TP = False
         print(f'{Fore.YELLOW}***{Fore.WHITE} Set build area around the player {Fore.YELLOW}***{Fore.WHITE}')
 
+    shadow.install()
     INTERFACE.setBuffering(not no_buffering)
     INTERFACE.placeBlockFlags(doBlockUpdates=True, customFlags='0100011')
 
@@ -67,6 +73,7 @@ def prepare_environment(debug: bool, tick_speed: int, no_buffering: bool, tp: bo
     if env.SHOW_TIME:
         time_took = time.time() - env.start_time
         print(f'Process took {time_took:.2f} s.')
+        print(f'Heightmaps built: {env.HEIGHTMAPS}')
 
 
 def start_simulation(years: int) -> None:
@@ -74,7 +81,6 @@ def start_simulation(years: int) -> None:
     start, end = env.BUILD_AREA
     build_area = Plot.from_coordinates(start, end)
     build_area.remove_lava()
-    env.WORLD = env.get_world_slice()
 
     if env.TP:
         command = f'tp @a {build_area.start.x} 110 {build_area.start.z}'
@@ -87,7 +93,11 @@ def start_simulation(years: int) -> None:
     simulation = Simulation(build_area, years)
     simulation.start()
 
-    INTERFACE.sendBlocks()
+    sender.flush()
+
+    if env.DEBUG:
+        print(f'=> Dropped {INTERFACE.globalinterface.redundant_writes} redundant block placements')
+        print(f'=> Skipped {INTERFACE.globalinterface.unchanged_writes} block placements already matching the world')
 
     INTERFACE.runCommand('gamerule randomTickSpeed 3')
     INTERFACE.runCommand('gamerule doEntityDrops true')
@@ -0,0 +1,142 @@
+from __future__ import annotations
+from typing import Generator, Iterable
+
+from collections import Counter
+from collections.abc import Sequence
+
+import numpy as np
+
+from src.blocks.block import Block
+from src.utils.coordinates import Coordinates, Size
+from src.world.voxel_grid import VoxelGrid
+
+
+class SurfaceView(Sequence):
+    """Class representing an immutable list of the blocks at the surface of an area, stored as arrays. The
+    [heightmap] and [ids] rasters are indexed as [x, z] relatively to the [origin] of the area and are usually
+    views of the rasters of the whole build area. Block objects are only created when a caller asks for one"""
+
+    def __init__(self, grid: VoxelGrid, origin: Coordinates, heightmap: np.ndarray, ids: np.ndarray,
+                 selected: np.ndarray = None):
+        """Parameterised constructor creating a new view of the surface blocks of the [grid], whose heights
+        are given by the [heightmap]. Only the cells of the [selected] mask are part of the view, if given"""
+        self.grid = grid
+        self.origin = origin
+        self.heightmap = heightmap
+        self.ids_raster = ids
+        self.selected = selected
+        self.__cells: np.ndarray | None = None
+
+    @property
+    def cells(self) -> np.ndarray:
+        """Return the flat indices, in the rasters, of the cells that are part of the view"""
+        if self.__cells is None:
+            self.__cells = np.arange(self.heightmap.size) if self.selected is None else np.flatnonzero(self.selected)
+        return self.__cells
+
+    @property
+    def x(self) -> np.ndarray:
+        """Return the x coordinates of the blocks of the view"""
+        return self.origin.x + self.cells // self.heightmap.shape[1]
+
+    @property
+    def y(self) -> np.ndarray:
+        """Return the y coordinates of the blocks of the view"""
+        return self.heightmap.ravel()[self.cells] - 1
+
+    @property
+    def z(self) -> np.ndarray:
+        """Return the z coordinates of the blocks of the view"""
+        return self.origin.z + self.cells % self.heightmap.shape[1]
+
+    @property
+    def ids(self) -> np.ndarray:
+        """Return the indices in the grid palette of the blocks of the view"""
+        return self.ids_raster.ravel()[self.cells]
+
+    @property
+    def counter(self) -> Counter[str]:
+        """Return the counter of the names of the blocks of the view, in order of first appearance"""
+        ids, first, counts = np.unique(self.ids, return_index=True, return_counts=True)
+
+        counter = Counter()
+        for index in np.argsort(first):
+            counter[self.grid.palette[ids[index]].split('[')[0]] += int(counts[index])
+        return counter
+
+    @property
+    def most_common(self) -> str | None:
+        """Return the name of the most common block of the view"""
+        occurences = self.counter.most_common(1)
+        return occurences[0][0] if occurences else None
+
+    def matching(self, pattern: str | Iterable[str]) -> np.ndarray:
+        """Return a boolean raster of the area, true where the block of the view contains the given [pattern]
+        in its name"""
+        pattern = (pattern, ) if type(pattern) is str else tuple(pattern)
+        matches = self.grid.matching(pattern)[self.ids_raster]
+        return matches if self.selected is None else matches & self.selected
+
+    def where(self, mask: np.ndarray) -> SurfaceView:
+        """Return a view of the blocks of the current view whose cell is true in the given boolean [mask]"""
+        selected = mask if self.selected is None else mask & self.selected
+        return SurfaceView(self.grid, self.origin, self.heightmap, self.ids_raster, selected)
+
+    def filter(self, pattern: str | Iterable[str]) -> SurfaceView:
+        """Return a view of the blocks containing the given [pattern] in their name"""
+        return self.where(self.matching(pattern))
+
+    def without(self, pattern: str | Iterable[str]) -> SurfaceView:
+        """Return a view of the blocks not containing the given [pattern] in their name"""
+        return self.where(~self.matching(pattern))
+
+    def crop(self, start: Coordinates, size: Size) -> SurfaceView:
+        """Return a view of the blocks in the rectangle of the given [size] starting at the [start] coordinates.
+        The parts of the rectangle outside of the area are ignored, and the rasters are not copied"""
+        x, z = max(start.x - self.origin.x, 0), max(start.z - self.origin.z, 0)
+        window = slice(x, max(start.x - self.origin.x + size.x, x)), slice(z, max(start.z - self.origin.z + size.z, z))
+
+        return SurfaceView(self.grid, self.origin.shift(x=x, z=z), self.heightmap[window], self.ids_raster[window],
+                           None if self.selected is None else self.selected[window])
+
+    def find(self, coordinates: Coordinates) -> Block | None:
+        """Return the block at the given 2D coordinates"""
+        x, z = coordinates.x - self.origin.x, coordinates.z - self.origin.z
+
+        if 0 <= x < self.heightmap.shape[0] and 0 <= z < self.heightmap.shape[1]:
+            if self.selected is None or self.selected[x, z]:
+                return self.__get_block(x, z)
+        return None
+
+    def __get_block(self, x: int, z: int) -> Block:
+        """Return the block of the cell x, z of the rasters"""
+        try:
+            return self.grid.get_block(self.origin.x + x, int(self.heightmap[x, z]) - 1, self.origin.z + z)
+        except IndexError:
+            return Block('out of bound', None)
+
+    def __iter__(self) -> Generator[Block]:
+        """Return a generator of the blocks of the view"""
+        size_z = self.heightmap.shape[1]
+        return (self.__get_block(cell // size_z, cell % size_z) for cell in self.cells.tolist())
+
+    def __len__(self) -> int:
+        """Return the number of blocks of the view"""
+        return self.heightmap.size if self.selected is None else len(self.cells)
+
+    def __bool__(self) -> bool:
+        """Return true if the current view is not empty, false otherwise"""
+        return len(self) > 0
+
+    def __getitem__(self, index: int | slice) -> Block | list[Block]:
+        """Return the block at the given index"""
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+
+        cell = int(self.cells[index])
+        return self.__get_block(cell // self.heightmap.shape[1], cell % self.heightmap.shape[1])
+
+    def __str__(self) -> str:
+        """Return the string representation of the current view"""
+        names = [str(block) for block in self]
+        return 'SurfaceView([' + ', '.join(names) + '])'
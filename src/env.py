@@ -5,9 +5,11 @@ from dataclasses import dataclass
 
 from gdpc import interface
 from gdpc.worldLoader import WorldSlice
-from nbt.nbt import MalformedFileError
 
 from src.utils.coordinates import Coordinates, Size
+from src.world import chunks
+from src.world.heightmaps import HeightmapRegistry
+from src.world.voxel_grid import VoxelGrid
 
 # The default build are
 BUILD_AREA = None
@@ -15,6 +17,12 @@ BUILD_AREA = None
 # The world slice of the build area
 WORLD = None
 
+# The voxel grid built from the world slice
+VOXELS = None
+
+# The heightmaps of the world slice, computed on demand
+HEIGHTMAPS = HeightmapRegistry()
+
 # Wether the simulation runs in debug mode or not
 DEBUG = False
 
@@ -29,6 +37,9 @@ start_time = time.time()
 
 PROFILE_TIME = False
 
+# Wether buildings are placed by trying every position and rotation or by sampling random positions
+EXHAUSTIVE_PLACEMENT = False
+
 
 @dataclass(frozen=True)
 class BuildArea:
@@ -60,16 +71,17 @@ def get_build_area(auto_build_area: bool = False) -> BuildArea:
     return BuildArea(Coordinates(x1, y1, z1), Coordinates(x2, y2, z2)).max_size(250)  # Prevent from huge size input
 
 
-def get_world_slice() -> WorldSlice | None:
-    """Set the WORLD attribute"""
-    while retry_amount := 20:
-        try:
-            return WorldSlice(BUILD_AREA.start.x, BUILD_AREA.start.z,
-                              BUILD_AREA.end.x + 1, BUILD_AREA.end.z + 1)
-        except MalformedFileError:
-            retry_amount -= 1
-            time.sleep(1)
-    print(f'Error: Could not get a world slice in {retry_amount} try')
+def get_world_slice() -> WorldSlice:
+    """Return the world slice of the BUILD_AREA, fetched by tiles of chunks or read from the cache"""
+    return chunks.load_world_slice(BUILD_AREA.start.x, BUILD_AREA.start.z, BUILD_AREA.end.x + 1, BUILD_AREA.end.z + 1)
+
+
+def load_world() -> None:
+    """Set the WORLD attribute, build the VOXELS grid from it and refresh the HEIGHTMAPS"""
+    global WORLD, VOXELS
+    WORLD = get_world_slice()
+    VOXELS = VoxelGrid.from_world_slice(WORLD)
+    HEIGHTMAPS.refresh(WORLD, VOXELS)
 
 
 def get_content(file: str, *, YAML: bool = True) -> Any:
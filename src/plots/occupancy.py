@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+from typing import Iterator
+
+import numpy as np
+
+from src.utils.coordinates import Coordinates, Size
+
+
+class OccupancyLayer:
+    """Boolean raster telling which cells of an area are taken. Cells are indexed as [x, z] relatively
+    to the [origin] of the area, the y coordinate is always ignored. A layer can be used like a set
+    of 2D coordinates, for instance with the in keyword"""
+
+    def __init__(self, origin: Coordinates, size: Size, mask: np.ndarray = None):
+        """Parameterised constructor creating a new layer covering the area of the given [size] starting
+        at the [origin] coordinates. The layer is empty unless a [mask] is given"""
+        self.origin = origin
+        self.size = size
+        self.mask = mask if mask is not None else np.zeros((size.x, size.z), dtype=bool)
+
+    def to_cell(self, coordinates: Coordinates) -> tuple[int, int] | None:
+        """Return the cell corresponding to the given [coordinates], or None if they are not in the area"""
+        x, z = coordinates.x - self.origin.x, coordinates.z - self.origin.z
+
+        if 0 <= x < self.size.x and 0 <= z < self.size.z:
+            return x, z
+        return None
+
+    def add(self, coordinates: Coordinates) -> None:
+        """Mark the cell at the given [coordinates] as taken. Coordinates outside of the area are ignored"""
+        if (cell := self.to_cell(coordinates)) is not None:
+            self.mask[cell] = True
+
+    def mark(self, start: Coordinates, size: Size, value: bool = True) -> None:
+        """Mark all the cells of the rectangle of the given [size] starting at the [start] coordinates as taken,
+        or as free if [value] is false. The parts of the rectangle outside of the area are ignored"""
+        self.mask[self.__window(start, size)] = value
+
+    def is_free(self, start: Coordinates, size: Size) -> bool:
+        """Return true if none of the cells of the rectangle of the given [size] starting at the [start]
+        coordinates is taken. The parts of the rectangle outside of the area are considered free"""
+        return not self.mask[self.__window(start, size)].any()
+
+    def __window(self, start: Coordinates, size: Size) -> tuple[slice, slice]:
+        """Return the slices of the mask covered by the rectangle of the given [size] starting at [start]"""
+        x, z = start.x - self.origin.x, start.z - self.origin.z
+        return slice(max(x, 0), max(x + size.x, 0)), slice(max(z, 0), max(z + size.z, 0))
+
+    def copy(self) -> OccupancyLayer:
+        """Return a copy of the current layer"""
+        return OccupancyLayer(self.origin, self.size, self.mask.copy())
+
+    def __contains__(self, coordinates: Coordinates) -> bool:
+        """Return true if the cell at the given [coordinates] is taken"""
+        cell = self.to_cell(coordinates)
+        return cell is not None and bool(self.mask[cell])
+
+    def __iter__(self) -> Iterator[Coordinates]:
+        """Return an iterator over the 2D coordinates of the taken cells"""
+        for x, z in zip(*np.nonzero(self.mask)):
+            yield Coordinates(self.origin.x + int(x), 0, self.origin.z + int(z))
+
+    def __len__(self) -> int:
+        """Return the number of taken cells"""
+        return int(np.count_nonzero(self.mask))
+
+    def __or__(self, other: OccupancyLayer) -> OccupancyLayer:
+        """Return a new layer whose cells are taken in the current layer or in the [other] one"""
+        return OccupancyLayer(self.origin, self.size, self.mask | other.mask)
+
+    def __and__(self, other: OccupancyLayer) -> OccupancyLayer:
+        """Return a new layer whose cells are taken in both the current layer and the [other] one"""
+        return OccupancyLayer(self.origin, self.size, self.mask & other.mask)
+
+    def __sub__(self, other: OccupancyLayer) -> OccupancyLayer:
+        """Return a new layer whose cells are taken in the current layer but not in the [other] one"""
+        return OccupancyLayer(self.origin, self.size, self.mask & ~other.mask)
+
+    def __invert__(self) -> OccupancyLayer:
+        """Return a new layer whose cells are the free cells of the current layer"""
+        return OccupancyLayer(self.origin, self.size, ~self.mask)
+
+    def __ior__(self, other: OccupancyLayer) -> OccupancyLayer:
+        """Mark the cells taken in the [other] layer as taken in the current layer"""
+        self.mask |= other.mask
+        return self
+
+
+class OccupancyMap:
+    """Named occupancy layers covering the same area"""
+
+    def __init__(self, origin: Coordinates, size: Size, names: tuple[str, ...]):
+        """Parameterised constructor creating one empty layer for each of the given [names]"""
+        self.origin = origin
+        self.size = size
+        self.layers = {name: OccupancyLayer(origin, size) for name in names}
+
+    def __getitem__(self, name: str) -> OccupancyLayer:
+        """Return the layer with the given [name]"""
+        return self.layers[name]
+
+    def new_layer(self) -> OccupancyLayer:
+        """Return a new empty layer covering the same area as the other layers, without naming it"""
+        return OccupancyLayer(self.origin, self.size)
@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import heapq
+
+import numpy as np
+
+from src.utils.coordinates import Coordinates
+
+
+class RoadPathfinder:
+    """Finds the paths of the roads on the surface of a plot. The surface is represented by 2D rasters
+    indexed as [x, z] relatively to the [origin] of the plot. It is possible to walk from one cell to
+    its four horizontal neighbours as long as their heights do not differ by more than one block"""
+
+    # Weight of an edge between two cells of a road
+    ROAD_WEIGHT = 10
+
+    # Weight of an edge touching an occupied cell
+    OCCUPIED_WEIGHT = 100_000_000
+
+    def __init__(self, origin: Coordinates, heights: np.ndarray, weights: np.ndarray):
+        """Parameterised constructor creating a new pathfinder from the [heights] of the surface blocks
+        and the [weights] of the edges leading to each cell"""
+        self.origin = origin
+        self.heights = heights
+        self.weights = weights
+
+        self.roads = np.zeros(heights.shape, dtype=bool)
+        self.occupied = np.zeros(heights.shape, dtype=bool)
+
+    @staticmethod
+    def from_steep_map(origin: Coordinates, heights: np.ndarray, steep_map: np.ndarray) -> RoadPathfinder:
+        """Return a new pathfinder whose weights are computed from the given [steep map], which must
+        have the same shape as the [heights]. Steep cells are penalised"""
+        malus = np.where(steep_map > 15, np.minimum(steep_map * 100, 100_000), steep_map)
+        return RoadPathfinder(origin, heights, 100 + malus * 10)
+
+    def to_cell(self, coordinates: Coordinates) -> tuple[int, int] | None:
+        """Return the cell corresponding to the given [coordinates], or None if they are not on the raster"""
+        x, z = coordinates.x - self.origin.x, coordinates.z - self.origin.z
+        size_x, size_z = self.heights.shape
+
+        if 0 <= x < size_x and 0 <= z < size_z:
+            return x, z
+        return None
+
+    def to_coordinates(self, x: int, z: int) -> Coordinates:
+        """Return the coordinates of the surface block of the given cell"""
+        return Coordinates(self.origin.x + x, int(self.heights[x, z]), self.origin.z + z)
+
+    def has_edge(self, u: Coordinates, v: Coordinates) -> bool:
+        """Return true if it is possible to walk between the two surface blocks at coordinates [u] and [v]"""
+        first, second = self.to_cell(u), self.to_cell(v)
+
+        if first is None or second is None or abs(first[0] - second[0]) + abs(first[1] - second[1]) != 1:
+            return False
+
+        return self.heights[first] == u.y and self.heights[second] == v.y and abs(u.y - v.y) <= 1
+
+    def occupy(self, coordinates: Coordinates) -> None:
+        """Mark the cell at the given [coordinates] as occupied, making it almost impossible to walk through"""
+        if (cell := self.to_cell(coordinates)) is not None:
+            self.occupied[cell] = True
+
+    def add_road(self, path: list[Coordinates]) -> None:
+        """Mark the cells of the given [path] as road, making it cheaper to walk along them"""
+        for coordinates in path:
+            if (cell := self.to_cell(coordinates)) is not None:
+                self.roads[cell] = True
+
+    def cell_weights(self) -> np.ndarray:
+        """Return the raster of the weights of the edges leading to each cell"""
+        return np.where(self.roads, RoadPathfinder.ROAD_WEIGHT,
+                        np.where(self.occupied, RoadPathfinder.OCCUPIED_WEIGHT, self.weights))
+
+    def find_path(self, start: Coordinates, end: Coordinates) -> list[Coordinates] | None:
+        """Return the list of the coordinates of the surface blocks forming the shortest path between [start]
+        and [end], or None if there is no such path. The search is an A* whose heuristic is the manhattan
+        distance multiplied by the lightest possible edge weight"""
+        target = self.to_cell(end)
+        if target is None:
+            return None
+
+        targets = np.zeros(self.heights.shape, dtype=bool)
+        targets[target] = True
+        return self.__search(start, targets, target)
+
+    def find_path_to_nearest(self, start: Coordinates, targets: np.ndarray) -> list[Coordinates] | None:
+        """Return the list of the coordinates of the surface blocks forming the shortest path between [start]
+        and the closest of the cells marked in the boolean [targets] raster, or None if none of them can be
+        reached. A single search is made whatever the number of targets"""
+        return self.__search(start, targets, None)
+
+    def __search(self, start: Coordinates, targets: np.ndarray, goal: tuple[int, int] | None) -> list[Coordinates] | None:
+        """Return the shortest path between [start] and the first reached cell of the [targets] raster. The search
+        is guided towards the [goal] cell if there is one, and behaves like a Dijkstra otherwise"""
+        source = self.to_cell(start)
+        if source is None or not targets.any():
+            return None
+
+        size_x, size_z = self.heights.shape
+        heights = self.heights.ravel().tolist()
+        weights = self.weights.ravel().tolist()
+        roads = self.roads.ravel().tolist()
+        occupied = self.occupied.ravel().tolist()
+        is_target = targets.ravel().tolist()
+
+        lightest = RoadPathfinder.ROAD_WEIGHT if self.roads.any() else min(weights)
+        if goal is None:
+            lightest = 0
+            goal = source
+
+        goal_x, goal_z = goal
+        source = source[0] * size_z + source[1]
+
+        distances = {source: 0}
+        previous = {}
+        queue = [(0, 0, source)]
+
+        while queue:
+            _, distance, current = heapq.heappop(queue)
+
+            if is_target[current]:
+                break
+
+            if distance > distances[current]:
+                continue
+
+            x, z = divmod(current, size_z)
+            for neighbour_x, neighbour_z in ((x + 1, z), (x - 1, z), (x, z + 1), (x, z - 1)):
+                if not (0 <= neighbour_x < size_x and 0 <= neighbour_z < size_z):
+                    continue
+
+                neighbour = neighbour_x * size_z + neighbour_z
+                if abs(heights[neighbour] - heights[current]) > 1:
+                    continue
+
+                if roads[current] and roads[neighbour]:
+                    weight = RoadPathfinder.ROAD_WEIGHT
+                elif occupied[current] or occupied[neighbour]:
+                    weight = RoadPathfinder.OCCUPIED_WEIGHT
+                else:
+                    weight = weights[neighbour]
+
+                new_distance = distance + weight
+                if new_distance < distances.get(neighbour, float('inf')):
+                    distances[neighbour] = new_distance
+                    previous[neighbour] = current
+
+                    estimate = lightest * (abs(goal_x - neighbour_x) + abs(goal_z - neighbour_z))
+                    heapq.heappush(queue, (new_distance + estimate, new_distance, neighbour))
+        else:
+            return None
+
+        path = [current]
+        while path[-1] != source:
+            path.append(previous[path[-1]])
+
+        return [self.to_coordinates(*divmod(cell, size_z)) for cell in reversed(path)]
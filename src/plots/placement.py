@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import numpy as np
+
+from src.utils import rasters
+from src.utils.coordinates import Size
+
+
+class FootprintScorer:
+    """Scores the footprints of buildings on the surface of a plot. The surface is represented by 2D
+    rasters indexed as [x, z] relatively to the start of the plot. The cost of any footprint is read
+    in constant time from summed-area tables, so that many candidates can be scored at once"""
+
+    # Score of a footprint on which it is not possible to build
+    INVALID_SCORE = 100_000_000
+
+    def __init__(self, heights: np.ndarray, valid: np.ndarray, water: np.ndarray):
+        """Parameterised constructor creating a new scorer from the [heights] of the surface blocks, the
+        raster of the cells that can be built on and the raster of the cells covered by water"""
+        self.heights = heights.astype(np.int64)
+        self.valid = valid
+
+        self.__invalid = rasters.integral_image(~valid)
+        self.__water = rasters.integral_image(water)
+        self.__costs: dict[int, np.ndarray] = {}
+
+    def get_cost_table(self, level: int) -> np.ndarray:
+        """Return the summed-area table of the cost of levelling each cell of the surface at the given
+        [level]. Putting foundations is not a problem compared to digging in the terrain"""
+        if level not in self.__costs:
+            delta = level - self.heights
+            cost = np.where(delta > 0, (delta * .8).astype(np.int64), -delta * 3)
+            self.__costs[level] = rasters.integral_image(cost)
+
+        return self.__costs[level]
+
+    def score(self, x: np.ndarray, z: np.ndarray, levels: np.ndarray, size: Size) -> np.ndarray:
+        """Return the scores of the footprints of the given [size] whose first cells are at [x], [z] and
+        that are levelled at the given [levels]. Footprints going out of the surface or covering a cell
+        that cannot be built on get the INVALID_SCORE"""
+        size_x, size_z = self.heights.shape
+        inside = (x >= 0) & (z >= 0) & (x + size.x <= size_x) & (z + size.z <= size_z)
+
+        if not inside.any():
+            return np.full(len(x), FootprintScorer.INVALID_SCORE, dtype=float)
+
+        x, z = np.where(inside, x, 0), np.where(inside, z, 0)
+
+        # Little malus on water to push buildings to generate on land
+        scores = rasters.box_sum(self.__water, x, z, size.x, size.z) * .5
+
+        for level in np.unique(levels):
+            at_level = levels == level
+            scores[at_level] += rasters.box_sum(self.get_cost_table(int(level)), x[at_level], z[at_level], size.x, size.z)
+
+        valid = inside & (rasters.box_sum(self.__invalid, x, z, size.x, size.z) == 0)
+        return np.where(valid, scores, FootprintScorer.INVALID_SCORE)
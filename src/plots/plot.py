@@ -1,14 +1,13 @@
 from __future__ import annotations
 
+import itertools
 import math
 import random
-from collections import defaultdict
+from collections import Counter
 from datetime import time as datetime
 import time as time
-from functools import lru_cache
-from typing import Generator
+from typing import Any, Callable, Generator
 
-import networkx as nx
 import numpy as np
 from gdpc import interface as INTF
 from gdpc import lookup
@@ -17,12 +16,21 @@ from numpy import ndarray
 from src import env
 from src.blocks.block import Block
 from src.blocks.collections.block_list import BlockList
+from src.blocks.collections.surface_view import SurfaceView
+from src.plots.occupancy import OccupancyLayer, OccupancyMap
+from src.plots.pathfinding import RoadPathfinder
+from src.plots.placement import FootprintScorer
 from src.simulation.buildings.utils.building_type import BuildingType
 from src.utils import math_utils
+from src.utils import rasters
 from src.utils.coordinates import Coordinates
 from src.utils.coordinates import Size
 from src.utils.criteria import Criteria
 from src.utils.direction import Direction
+from src.world import fills, sender
+
+# Parts of a road, from the most to the least important, and their maximum distance to the middle of the road
+ROAD_PARTS = {'INNER': 0, 'MIDDLE': 1, 'OUTER': 2}
 
 
 class Plot:
@@ -34,24 +42,77 @@ class Plot:
         self.end = Coordinates(x + size.x, 255, z + size.z)
         self.size = size
         self.offset = self.start - env.BUILD_AREA.start, self.end - env.BUILD_AREA.start
-        self.surface_blocks: dict[Criteria, BlockList] = {}
-        self.water_mode = 'water' in self.get_blocks(Criteria.MOTION_BLOCKING_NO_TREES).most_common
+
+        # Statistics of the terrain of the plot, computed when first needed, with the revision of the heightmaps
+        self.__terrain: dict[str, tuple[int, Any]] = {}
+
+    def __get_terrain(self, key: str, compute: Callable[[], Any]) -> Any:
+        """Return the terrain statistic of the given [key], computing it with the [compute] function again
+        only if a column of the plot has changed since it was last computed"""
+        revision = env.HEIGHTMAPS.get_revision(slice(self.offset[0].x, self.offset[1].x),
+                                               slice(self.offset[0].z, self.offset[1].z))
+
+        if key not in self.__terrain or self.__terrain[key][0] < revision:
+            self.__terrain[key] = revision, compute()
+        return self.__terrain[key][1]
+
+    @property
+    def surface_counter(self) -> Counter[str]:
+        """Return the number of blocks of each name at the surface of the plot, without the trees"""
+        return self.__get_terrain('counter', lambda: self.get_blocks(Criteria.MOTION_BLOCKING_NO_TREES).counter)
+
+    @property
+    def dominant_block(self) -> str | None:
+        """Return the name of the most common block at the surface of the plot, without the trees"""
+        occurences = self.surface_counter.most_common(1)
+        return occurences[0][0] if occurences else None
+
+    @property
+    def water_mode(self) -> bool:
+        """Return true if the surface of the plot is mostly made of water"""
+        return 'water' in (self.dominant_block or '')
+
+    @property
+    def mean_height(self) -> float:
+        """Return the average y coordinate of the surface blocks of the plot, without the trees"""
+        return self.__get_terrain('mean_height', lambda: float(self.get_heightmap(Criteria.MOTION_BLOCKING_NO_TREES).mean()) - 1)
+
+    @property
+    def slope(self) -> float:
+        """Return the average height difference between the neighbouring surface blocks of the plot"""
+        def compute() -> float:
+            heightmap = self.get_heightmap(Criteria.MOTION_BLOCKING_NO_TREES)
+            deltas = np.concatenate((np.diff(heightmap, axis=0).ravel(), np.diff(heightmap, axis=1).ravel()))
+            return float(np.abs(deltas).mean()) if deltas.size else 0.
+
+        return self.__get_terrain('slope', compute)
 
     def remove_lava(self):
-        checked = set()
-        lava_blocks = list(self.get_blocks(criteria=Criteria.MOTION_BLOCKING_NO_TREES).filter('lava'))
-        while lava_blocks:
-            block = lava_blocks.pop()
-            checked.add(block)
-            INTF.placeBlock(*block.coordinates, 'obsidian')  # water to cancel the lava
-
-            # Check for neighbors
-            for coord_neighbor in block.neighbouring_coordinates():
-                neighbor = self.get_block_at(*coord_neighbor)
-                if neighbor and 'lava' in neighbor.name and neighbor not in checked and coord_neighbor in self:
-                    lava_blocks.append(neighbor)
+        """Replace the lava bodies flowing at the surface of the plot with obsidian. Lava blocks are searched
+        from the surface only, and the bodies found are filled with a few cuboids"""
+        surface = self.get_surface_mask('lava', Criteria.MOTION_BLOCKING_NO_TREES)
 
-        INTF.sendBlocks()
+        x, z = np.nonzero(surface)
+        y = self.get_heightmap(Criteria.MOTION_BLOCKING_NO_TREES)[x, z] - 1 - self.start.y
+        if not (y >= 0).any():
+            return
+
+        start_x, start_z = self.offset[0].x, self.offset[0].z
+        ids = env.VOXELS.ids[start_x:start_x + surface.shape[0], self.start.y:, start_z:start_z + surface.shape[1]]
+        lava = env.VOXELS.matching('lava')
+
+        seeds = np.stack((x, y, z), axis=1)[y >= 0]
+        cells = rasters.flood_fill(seeds, lambda cells: lava[ids[tuple(cells.T)]], ids.shape,
+                                   [direction.value for direction in Direction])
+
+        # Only keep the bounding box of the lava blocks to fill them
+        lower = cells.min(axis=0)
+        lava_body = np.zeros(tuple(cells.max(axis=0) - lower + 1), dtype=bool)
+        lava_body[tuple((cells - lower).T)] = True
+        amount = fills.fill_mask(self.start.shift(*lower.tolist()), lava_body, 'obsidian')
+
+        if env.DEBUG:
+            print(f'=> Replaced {len(cells)} lava blocs with {amount} fill commands')
 
     @ staticmethod
     def from_coordinates(start: Coordinates, end: Coordinates) -> Plot:
@@ -59,9 +120,10 @@ class Plot:
         return Plot(*start, Size.from_coordinates(start, end))
 
     def update(self) -> None:
-        """Update the env.WORLD slice and most importantly the heightmaps"""
-        env.get_world_slice()
-        self.surface_blocks.clear()
+        """Update the env.WORLD slice and most importantly the heightmaps, once every block sent is placed"""
+        sender.flush()
+        env.load_world()
+        self.__terrain.clear()
 
     def visualize(self, ground: str = 'orange_wool', criteria: Criteria = Criteria.MOTION_BLOCKING_NO_TREES) -> None:
         """Change the blocks at the surface of the plot to visualize it"""
@@ -70,96 +132,71 @@ class Plot:
         INTF.sendBlocks()
 
     @staticmethod
-    @lru_cache(maxsize=100_000)
     def get_block_at(x: int, y: int, z: int) -> Block:
-        """Return the block found at the given x, y, z coordinates in the env.WORLD"""
+        """Return the block found at the given x, y, z coordinates in the env.VOXELS grid"""
         try:
-            name = env.WORLD.getBlockAt(x, y, z)
-            return Block.deserialize(name, Coordinates(x, y, z))
+            return env.VOXELS.get_block(x, y, z)
         except IndexError:
             return Block('out of bound', None)
 
     def get_heightmap(self, criteria: Criteria) -> ndarray:
         """Return the desired heightmap of the given type"""
-        # Add our custom
-        if Criteria.MOTION_BLOCKING_NO_TREES not in env.WORLD.heightmaps:
-            env.WORLD.heightmaps[Criteria.MOTION_BLOCKING_NO_TREES.name] = self.__get_heightmap_no_trees()
-
-        if criteria.name in env.WORLD.heightmaps.keys():
-            return env.WORLD.heightmaps[criteria.name][self.offset[0].x:self.offset[1].x,
-                                                       self.offset[0].z:self.offset[1].z]
-
-        raise Exception(f'Invalid criteria: {criteria}')
-
-    def get_blocks(self, criteria: Criteria) -> BlockList:
-        """Return a list of the blocks at the surface of the plot, using the given criteria"""
-
-        if criteria in self.surface_blocks.keys():
-            return self.surface_blocks[criteria]
-
-        surface = []
-        heightmap = self.get_heightmap(criteria)
-
-        for x, rest in enumerate(heightmap):
-            for z, h in enumerate(rest):
-                coordinates = Coordinates(self.start.x + x, h - 1, self.start.z + z)
-                surface.append(self.get_block_at(*coordinates))
-
-        self.surface_blocks[criteria] = BlockList(surface)
-        return self.surface_blocks[criteria]
-
-    def __get_heightmap_no_trees(self) -> np.ndarray:
-        """Return a list of block representing a heightmap without trees
-
-        It is not perfect as sometimes, there can be flower or grass or other blocks between the ground and the '
-        floating' logs, but it is good enough for our use"""
-        heightmap = np.copy(env.WORLD.heightmaps[Criteria.MOTION_BLOCKING_NO_LEAVES.name])
-
-        for x, rest in enumerate(heightmap):
-            for z, h in enumerate(rest):
-                base_coord = Coordinates(env.BUILD_AREA.start.x + x, h - 1, env.BUILD_AREA.start.z + z)
-
-                ground_coord = None
-                # To get to the last block until the ground
-                for ground_coord in self.__yield_until_ground(base_coord):
-                    pass
-                if ground_coord:
-                    heightmap[x, z] = ground_coord.y
-
-        return heightmap
-
-
-    def remove_trees(self, surface: BlockList = None) -> None:
-        """Remove all plants at the surface of the current plot"""
+        return env.HEIGHTMAPS.get(criteria)[self.offset[0].x:self.offset[1].x,
+                                            self.offset[0].z:self.offset[1].z]
+
+    def get_blocks(self, criteria: Criteria) -> SurfaceView:
+        """Return a view of the blocks at the surface of the plot, using the given criteria. The view shares
+        the rasters of the whole build area, so no block is created until one is asked for"""
+        window = slice(self.offset[0].x, self.offset[1].x), slice(self.offset[0].z, self.offset[1].z)
+        return SurfaceView(env.VOXELS, self.start, env.HEIGHTMAPS.get(criteria)[window],
+                           env.HEIGHTMAPS.get_surface_ids(criteria)[window])
+
+    def remove_trees(self, surface: SurfaceView = None) -> None:
+        """Remove all plants at the surface of the current plot. The blocks to clear above the ground are
+        computed for all the columns at once, and removed with fill commands"""
         pattern = ('log', 'bush', 'mushroom', 'bamboo')
 
         if surface is None:
             surface = self.get_blocks(Criteria.MOTION_BLOCKING_NO_LEAVES)
 
-        amount = 0
-        unwanted_blocks = surface.filter(pattern).to_set()
+        unwanted_blocks = surface.filter(pattern)
+        x, y, z = unwanted_blocks.x, unwanted_blocks.y, unwanted_blocks.z
 
         if env.DEBUG:
             print(f'\n=> Removing trees on plot at {self.start} with size {self.size}')
 
-        while unwanted_blocks:
-            block = unwanted_blocks.pop()
-            for coord in self.__yield_until_ground(block.coordinates):
-                INTF.placeBlock(*coord, 'minecraft:air')
-                amount += 1
+        # Empty columns are outside of the voxel grid
+        if not (y >= 0).any():
+            return
 
-        INTF.sendBlocks()
-        if env.DEBUG:
-            print(f'=> Deleted {amount} blocs\n')
-        # self.update()
+        grid = env.VOXELS
+        x, y, z = x[y >= 0] - grid.origin.x, y[y >= 0], z[y >= 0] - grid.origin.z
 
-    def __yield_until_ground(self, coordinates: Coordinates):
-        """Yield the coordinates """
-        current_coord: Coordinates = coordinates
+        # Each column is cleared from the unwanted block down to the first block of the ground
+        columns = grid.ids[x, :, z]
+        heights = np.arange(columns.shape[1])[np.newaxis, :]
+        ground = ~grid.matching(('air', 'leaves', 'log', 'vine', 'bamboo'))[columns] & (heights <= y[:, np.newaxis])
+        bottom = np.where(ground.any(axis=1), columns.shape[1] - np.argmax(ground[:, ::-1], axis=1), 0)
+        cleared = (heights >= bottom[:, np.newaxis]) & (heights <= y[:, np.newaxis])
 
-        while self.get_block_at(*current_coord).is_one_of(('air', 'leaves', 'log', 'vine', 'bamboo')):
-            yield current_coord
-            current_coord = current_coord.shift(0, -1, 0)
+        # Gather the cleared blocks in a volume covering the columns
+        start_x, start_z = x.min(), z.min()
+        size_x, size_z = x.max() - start_x + 1, z.max() - start_z + 1
+
+        volume = np.zeros((size_x * size_z, columns.shape[1]), dtype=bool)
+        np.logical_or.at(volume, (x - start_x) * size_z + z - start_z, cleared)
+        volume = volume.reshape(size_x, size_z, -1).transpose(0, 2, 1)
+
+        amount = fills.fill_mask(grid.origin.shift(start_x, 0, start_z), volume, 'minecraft:air')
+
+        if env.DEBUG:
+            deleted = np.count_nonzero(volume)
+            print(f'=> Deleted {deleted} blocs with {amount} fill commands, saving {deleted - amount} commands\n')
+
+    def get_surface_mask(self, pattern: str | tuple[str, ...], criteria: Criteria) -> ndarray:
+        """Return a boolean raster of the plot, true where the surface block found using the given
+        criteria contains the given [pattern] in its name"""
+        return self.get_blocks(criteria).matching(pattern)
 
     def build_foundation(self, build_area: Plot) -> None:
         """Build the foundations under the house"""
@@ -167,50 +204,54 @@ class Plot:
             blocks = ('stone_bricks', 'diorite', 'cobblestone')
             weights = (75, 15, 10)
 
-            for coord in self.__iterate_over_air(self.start.y):
-                block = random.choices(blocks, weights)
-                INTF.placeBlock(*coord, block)
+            # Fill each column from the surface block up to the floor of the house
+            heights = self.get_heightmap(Criteria.MOTION_BLOCKING_NO_TREES) - 1
+            bottom = min(int(heights.min()), self.start.y)
+
+            y = np.arange(bottom, self.start.y)[np.newaxis, :, np.newaxis]
+            volume = (y >= heights[:, np.newaxis, :]) & (y < self.start.y)
+
+            # The most common block is filled everywhere, the others are placed on top of it
+            fills.fill_mask(self.start.with_points(y=bottom), volume, blocks[0])
+
+            chosen = random.choices(range(len(blocks)), weights, k=np.count_nonzero(volume))
+            for (x, y, z), index in zip(np.argwhere(volume), chosen):
+                if index:
+                    INTF.placeBlock(self.start.x + x, bottom + y, self.start.z + z, blocks[index])
         else:
+            end = self.start.shift(x=self.size.x - 1, z=self.size.z - 1)
 
             # INSIDE
-            for coord in self.surface():
-                INTF.placeBlock(*coord, "oak_planks")
+            cuboids = [(self.start, end, 'oak_planks')]
 
             # OUTER FRAME
-            for coord in self.start.shift(x=-3, z=-1).line(self.size.x + 4, Direction.EAST):
-                if coord in build_area:
-                    INTF.placeBlock(*coord, "oak_log[axis=x]")
-                c = coord.shift(z=self.size.z + 1)
-                if c in build_area:
-                    INTF.placeBlock(*c, "oak_log[axis=x]")
-            for coord in self.start.shift(x=-1, z=-3).line(self.size.z + 4, Direction.SOUTH):
-                if coord in build_area:
-                    INTF.placeBlock(*coord, "oak_log[axis=z]")
-                c = coord.shift(x=self.size.x + 1)
-                if c in build_area:
-                    INTF.placeBlock(*c, "oak_log[axis=z]")
-
-            # PILLARS
-            for coord in self.start.shift(x=-1, y=2, z=-1).line(50, Direction.DOWN):
-                if coord in build_area:
-                    INTF.placeBlock(*coord, "oak_log[axis=y]")
-                c = coord.shift(x=self.size.x + 1)
-                if c in build_area:
-                    INTF.placeBlock(*c, "oak_log[axis=y]")
-                c = coord.shift(x=self.size.x + 1, z=self.size.z + 1)
-                if c in build_area:
-                    INTF.placeBlock(*c, "oak_log[axis=y]")
-                c = coord.shift(z=self.size.z + 1)
-                if c in build_area:
-                    INTF.placeBlock(*c, "oak_log[axis=y]")
+            for start, end, block in (
+                    (self.start.shift(x=-2, z=-1), end.shift(x=2, z=-self.size.z), 'oak_log[axis=x]'),
+                    (self.start.shift(x=-2, z=self.size.z), end.shift(x=2, z=1), 'oak_log[axis=x]'),
+                    (self.start.shift(x=-1, z=-2), end.shift(x=-self.size.x, z=2), 'oak_log[axis=z]'),
+                    (self.start.shift(x=self.size.x, z=-2), end.shift(x=1, z=2), 'oak_log[axis=z]'),
+
+                    # PILLARS
+                    (self.start.shift(x=-1, y=-48, z=-1), self.start.shift(x=-1, y=1, z=-1), 'oak_log[axis=y]'),
+                    (self.start.shift(x=self.size.x, y=-48, z=-1), self.start.shift(x=self.size.x, y=1, z=-1), 'oak_log[axis=y]'),
+                    (self.start.shift(x=self.size.x, y=-48, z=self.size.z), self.start.shift(x=self.size.x, y=1, z=self.size.z), 'oak_log[axis=y]'),
+                    (self.start.shift(x=-1, y=-48, z=self.size.z), self.start.shift(x=-1, y=1, z=self.size.z), 'oak_log[axis=y]')):
+                if (cuboid := build_area.clip(start, end)) is not None:
+                    cuboids.append((*cuboid, block))
+
+            fills.fill_cuboids(cuboids)
 
         INTF.sendBlocks()
 
-    def __iterate_over_air(self, max_y: int) -> Coordinates:
-        """"""
-        for block in self.get_blocks(Criteria.MOTION_BLOCKING_NO_TREES):
-            for new_y in range(block.coordinates.y, max_y):
-                yield block.coordinates.with_points(y=new_y)
+    def clip(self, start: Coordinates, end: Coordinates) -> tuple[Coordinates, Coordinates] | None:
+        """Return the first and last coordinates of the part of the cuboid between the [start] and [end]
+        coordinates, both included, that is inside the current plot. Return None if there is no such part"""
+        first = Coordinates(max(start.x, self.start.x), max(start.y, self.start.y), max(start.z, self.start.z))
+        last = Coordinates(min(end.x, self.end.x - 1), min(end.y, self.end.y), min(end.z, self.end.z - 1))
+
+        if first.x > last.x or first.y > last.y or first.z > last.z:
+            return None
+        return first, last
 
     def __contains__(self, coordinates: Coordinates) -> bool:
         """Return true if the current plot contains the given coordinates"""
@@ -237,8 +278,9 @@ class LogicPlot(Plot):
         super().__init__(x, y, z, size)
 
         # BUILDING PLACEMENT LOGIC
-        self.occupied_coordinates: set[Coordinates] = set()
-        self.construction_coordinates: set[Coordinates] = set()
+        self.layers = OccupancyMap(self.start, self.size, ('occupied', 'construction', 'roads'))
+        self.occupied_coordinates: OccupancyLayer = self.layers['occupied']
+        self.construction_coordinates: OccupancyLayer = self.layers['construction']
         # TODO change center into coordinates
         self.center = self.start.x + self.size.x // 2, self.start.z + self.size.z // 2
 
@@ -247,18 +289,15 @@ class LogicPlot(Plot):
         self.priority_blocks: BlockList | None = None
 
         # ROAD LOGIC
-        self.graph = None
+        self.pathfinder: RoadPathfinder | None = None
 
-        self.all_roads: set[Coordinates] = set()
-        self.roads_infos: dict[str, defaultdict[Coordinates, int]] = {'INNER': defaultdict(int),
-                                                                      'MIDDLE': defaultdict(int),
-                                                                      'OUTER': defaultdict(int)}
-        self.__recently_added_roads = None
-        self.roads_y = None
-
-    @staticmethod
-    def _delta_sum(values: list, base: int) -> int:
-        return sum(abs(base - v) for v in values)
+        self.all_roads: OccupancyLayer = self.layers['roads']
+        self.road_widths: dict[str, int] = dict(ROAD_PARTS)
+        # Index in road_widths, starting at 1, of the most important road part covering each cell
+        self.road_parts = np.zeros((size.x, size.z), dtype=np.int8)
+        # Number of roads whose most important part covering each cell is the one in road_parts
+        self.road_counts = np.zeros((size.x, size.z), dtype=np.int64)
+        self.roads_y: ndarray | None = None
 
     def flat_heightmap_to_plot_block(self, index: int) -> Block | None:
         surface = self.get_blocks(Criteria.MOTION_BLOCKING_NO_TREES)
@@ -276,15 +315,10 @@ class LogicPlot(Plot):
 
         heightmap: np.ndarray = self.get_heightmap(Criteria.MOTION_BLOCKING_NO_TREES)
         water_value = 100_000_000 if not self.water_mode else 10
-        steep = np.empty(shape=(self.size.x - 2 * span, self.size.z - 2 * span))
-        for i in range(span, self.size.x - span):
-            for j in range(span, self.size.z - span):
-                block = self.get_blocks(Criteria.MOTION_BLOCKING_NO_TREES).find(self.start.shift(i, 0, j))
-                if block.is_one_of(('water',)):
-                    steep[i - span, j - span] = water_value
-                else:
-                    steep[i - span, j - span] = self._delta_sum(
-                        heightmap[i - span: i + 1 + span, j - span: j + 1 + span].flatten(), heightmap[i, j])
+
+        steep = rasters.window_delta_sum(heightmap, span).astype(float)
+        water = self.get_surface_mask('water', Criteria.MOTION_BLOCKING_NO_TREES)
+        steep[water[span:water.shape[0] - span, span:water.shape[1] - span]] = water_value
 
         self.steep_map = steep.flatten()
 
@@ -294,31 +328,27 @@ class LogicPlot(Plot):
         blocks = []
         for p in prio:
             block = self.flat_heightmap_to_plot_block(p)
-            if block and block not in self.occupied_coordinates:
+            if block and block.coordinates.as_2D() not in self.occupied_coordinates:
                 blocks.append(block)
         self.priority_blocks = BlockList(blocks)
 
-    def fill_graph(self):
+    def build_pathfinder(self):
         start = time.time()
-        self.graph = nx.Graph()
         if self.steep_map is None:
             self.compute_steep_map()
 
-        for block in self.get_blocks(Criteria.MOTION_BLOCKING_NO_TREES):
-            self.graph.add_node(block.coordinates)
+        span = self.steep_factor
+        heightmap = self.get_heightmap(Criteria.MOTION_BLOCKING_NO_TREES)
+
+        # Cells on the border of the plot take the steepness of the closest cell of the steep map
+        steep = self.steep_map.reshape(heightmap.shape[0] - 2 * span, heightmap.shape[1] - 2 * span)
+        steep = np.pad(steep, span, mode='edge')
 
-        for coordinates in self.graph.nodes.keys():
-            for coord in coordinates.neighbours():
-                if coord in self.graph.nodes.keys():
-                    # self.graph.add_edge(coordinates, coord, weight=100 + abs(coord.y - coordinates.y) * 10)
-                    malus = self.get_steep_map_value(coord)
-                    if malus > 15:
-                        malus = min(malus * 100, 100_000)
-                    self.graph.add_edge(coordinates, coord, weight=100 + malus * 10)
+        self.pathfinder = RoadPathfinder.from_steep_map(self.start, heightmap - 1, steep)
 
         if env.SHOW_TIME:
             time_took = time.time() - start
-            print(f'Computed graph in {time_took:.2f} s.')
+            print(f'Computed pathfinder in {time_took:.2f} s.')
 
     def get_steep_map_value(self, coord: Coordinates) -> int:
         if self.steep_map is None:
@@ -346,22 +376,19 @@ class LogicPlot(Plot):
                 INTF.placeBlock(*block.coordinates, colors[min(int(value // span), 8)] + '_stained_glass')
         INTF.sendBlocks()
 
-    def visualize_graph(self):
+    def visualize_pathfinder(self):
         colors = ('lime', 'white', 'pink', 'yellow', 'orange', 'red', 'magenta', 'purple', 'black')
-        for coord in self.graph.nodes():
-            weights = list(map(lambda edge: self.graph[edge[0]][edge[1]]['weight'], self.graph.edges(coord)))
-            if len(weights) == 0:
-                chose_color = 'blue'
-            else:
-                coord_access_value = min(weights)
-                chose_color = 'black'
-                if coord_access_value < 50:
-                    chose_color = colors[0]
-                elif coord_access_value < 110:
-                    continue  # 'default' value, don't show
-                elif coord_access_value < 150:
-                    chose_color = colors[2]
-            INTF.placeBlock(*(coord.shift(y=1)), chose_color + '_stained_glass')
+        weights = self.pathfinder.cell_weights()
+        for x, z in np.ndindex(weights.shape):
+            coord_access_value = weights[x, z]
+            chose_color = 'black'
+            if coord_access_value < 50:
+                chose_color = colors[0]
+            elif coord_access_value < 110:
+                continue  # 'default' value, don't show
+            elif coord_access_value < 150:
+                chose_color = colors[2]
+            INTF.placeBlock(*(self.pathfinder.to_coordinates(x, z).shift(y=1)), chose_color + '_stained_glass')
         INTF.sendBlocks()
 
 
@@ -372,25 +399,24 @@ class BuildPlacementPlot(LogicPlot):
     def get_subplot(self, building, rotation: int, max_score: int, city_buildings: list = None) -> Plot | None:
         """Return the best coordinates to place a building of a certain size, minimizing its score"""
         start = time.time()
-        padding = 5
 
         size = building.get_size()
         if max_score is None:
             max_score = size.x * size.z
         shift = building.get_entrance_with_rotation(rotation)
-        accepted_score = min(size.x, size.z)
 
-        if self.graph is None:
-            self.fill_graph()
+        if self.pathfinder is None:
+            self.build_pathfinder()
 
         # TODO add .lower_than(max_height=200)
 
-        surface = self.get_blocks(Criteria.MOTION_BLOCKING_NO_TREES)
-
         excluded = ('water', 'lava')
         if self.water_mode:
             excluded = ('lava',)
-        surface = BlockList(surface.get_valid_build_block_list(excluded, self.occupied_coordinates))
+
+        scorer = self.__get_scorer(excluded)
+        surface = self.get_blocks(Criteria.MOTION_BLOCKING_NO_TREES)
+        surface = surface.where(scorer.valid)
 
         batch_amount = 5
         batch_size = 100
@@ -412,19 +438,21 @@ class BuildPlacementPlot(LogicPlot):
             # generate new batch
         # >Get the minimal score in the coordinate list
 
-            amount_of_block_checked = 0
-            for block in blocks_to_check:
-                block_score = self.__get_score(coordinates=block.coordinates, surface=surface, max_score=max_score,
-                                               best_current_score=min_score, building=building, size=size, shift=shift,
-                                               city_buildings=city_buildings)
+            x, y, z = (np.array(axis, dtype=int) for axis in zip(*(block.coordinates for block in blocks_to_check)))
+            scores = self.__get_scores(x, y, z, scorer, max_score=max_score, building=building, size=size, shift=shift)
+            amount_of_block_checked = len(blocks_to_check)
 
-                if block_score < min_score:
-                    best_coordinates = block.coordinates
-                    min_score = block_score
-
-                if block_score < accepted_score:
+            for index in np.argsort(scores, kind='stable'):
+                if scores[index] >= min_score:
                     break
-                amount_of_block_checked += 1
+
+                # Buildings must be reachable from the roads of the city
+                if city_buildings and not self.__is_reachable(blocks_to_check[index].coordinates):
+                    continue
+
+                best_coordinates = blocks_to_check[index].coordinates
+                min_score = scores[index]
+                break
 
             if env.DEBUG:
                 print(f'Best score : {min_score}')
@@ -437,13 +465,92 @@ class BuildPlacementPlot(LogicPlot):
         if min_score >= max_score:
             return None
 
-        sub_plot = Plot(*(best_coordinates - shift), size=size)
+        sub_plot = self.__reserve(building, best_coordinates, size, shift)
+
+        if env.SHOW_TIME:
+            time_took = time.time() - start
+            print(f'Found plot for building {building.name} in {time_took:.2f} s.')
+            print(f'Check {amount_of_block_checked}, average : { amount_of_block_checked / time_took :.2f} blocks per seconds.')
+
+        return sub_plot
+
+    def get_best_subplot(self, building, max_score: int, city_buildings: list = None) -> Plot | None:
+        """Return the best coordinates to place a building, minimizing its score over every position of the
+        plot and each of the four rotations. The rotation of the [building] is set to the chosen one"""
+        start = time.time()
+
+        if max_score is None:
+            max_score = building.get_size().x * building.get_size().z
+
+        if self.pathfinder is None:
+            self.build_pathfinder()
+
+        excluded = ('water', 'lava')
+        if self.water_mode:
+            excluded = ('lava',)
+
+        scorer = self.__get_scorer(excluded)
+
+        # Every block of the surface that is not excluded nor occupied may be the entrance of the building
+        x, z = np.nonzero(scorer.valid)
+        y = scorer.heights[x, z]
+        x, z = x + self.start.x, z + self.start.z
+
+        candidates = []
+        for rotation in (0, 90, 180, 270):
+            size = building.structures[0].get_size(rotation)
+            shift = building.get_entrance_with_rotation(rotation)
+            scores = self.__get_scores(x, y, z, scorer, max_score=max_score, building=building, size=size, shift=shift)
+
+            kept = np.nonzero(scores < max_score)[0]
+            candidates.extend(zip(scores[kept], itertools.repeat(rotation), kept))
+
+        candidates.sort(key=lambda candidate: candidate[0])
+
+        for score, rotation, index in candidates:
+            coordinates = Coordinates(int(x[index]), int(y[index]), int(z[index]))
+
+            # Buildings must be reachable from the roads of the city
+            if city_buildings and not self.__is_reachable(coordinates):
+                continue
+
+            building.rotation = rotation
+            sub_plot = self.__reserve(building, coordinates, building.get_size(),
+                                      building.get_entrance_with_rotation(rotation))
+
+            if env.SHOW_TIME:
+                time_took = time.time() - start
+                print(f'Found plot for building {building.name} in {time_took:.2f} s.')
+                print(f'Check {len(x) * 4} placements, best score : {score}.')
+
+            return sub_plot
+
+        return None
+
+    def __get_scorer(self, excluded: tuple[str, ...]) -> FootprintScorer:
+        """Return a new footprint scorer for the surface of the plot, on which the blocks containing
+        one of the [excluded] patterns and the occupied blocks cannot be built on"""
+        heights = self.get_heightmap(Criteria.MOTION_BLOCKING_NO_TREES) - 1
+        valid = ~self.get_surface_mask(excluded, Criteria.MOTION_BLOCKING_NO_TREES) & ~self.occupied_coordinates.mask
+        water = self.get_surface_mask('water', Criteria.MOTION_BLOCKING_NO_TREES)
+        return FootprintScorer(heights, valid, water)
+
+    def __reserve(self, building, coordinates: Coordinates, size: Size, shift: Coordinates) -> Plot:
+        """Return the plot of the given [size] on which the [building] will be built, its entrance being
+        at the given [coordinates]. The plot and the area around it are marked as occupied"""
+        padding = 5
+
+        if building.properties.type == BuildingType.MINING:
+            if (depth := self.__get_cave_depths(np.array([coordinates.x]), np.array([coordinates.z]), size)[0]) > 0:
+                building.depth = (int(depth) // 5) + 1
+
+        sub_plot = Plot(*(coordinates - shift), size=size)
 
-        coord = best_coordinates - shift
+        coord = coordinates - shift
         if env.DEBUG:
             print(f"shift {shift}")
-            print(best_coordinates in map(lambda b: b.coordinates, self.get_blocks(Criteria.MOTION_BLOCKING_NO_TREES)))
-            print(best_coordinates)
+            print(coordinates in map(lambda b: b.coordinates, self.get_blocks(Criteria.MOTION_BLOCKING_NO_TREES)))
+            print(coordinates)
             print(coord in map(lambda b: b.coordinates, self.get_blocks(Criteria.MOTION_BLOCKING_NO_TREES)))
 
         if building.properties.type is BuildingType.FARM:
@@ -452,125 +559,69 @@ class BuildPlacementPlot(LogicPlot):
         if building.properties.type is BuildingType.DECORATION:
             padding = 2
 
-        for coordinates in sub_plot.surface(padding):
-
-            self.occupied_coordinates.add(coordinates.as_2D())
+        area = self.layers.new_layer()
+        area.mark(sub_plot.start.shift(x=-padding, z=-padding), sub_plot.size + 2 * padding)
 
-            block = self.get_blocks(Criteria.MOTION_BLOCKING_NO_TREES).find(coordinates)
-            if block and block.coordinates.as_2D() not in self.all_roads:
-                for edges in self.graph.edges(block.coordinates):
-                    self.graph.add_edge(*edges, weight=100_000_000)
+        self.occupied_coordinates |= area
+        self.pathfinder.occupied |= (area - self.all_roads).mask
 
-        for coordinates in sub_plot.surface():
-            self.construction_coordinates.add(coordinates.as_2D())
+        self.construction_coordinates.mark(sub_plot.start, sub_plot.size)
 
         if env.DEBUG:
-            self.visualize_graph()
-
-        if env.SHOW_TIME:
-            time_took = time.time() - start
-            print(f'Found plot for building {building.name} in {time_took:.2f} s.')
-            print(f'Check {amount_of_block_checked}, average : { amount_of_block_checked / time_took :.2f} blocks per seconds.')
+            self.visualize_pathfinder()
 
         return sub_plot
 
-    def __get_score(self, coordinates: Coordinates, surface: BlockList, max_score: int,
-                    best_current_score: int, building, size: Size, shift: Coordinates,
-                    city_buildings: list = None) -> float:
-        """Return a score evaluating the fitness of a building in an area.
-            The lower the score, the better it fits
+    def __get_scores(self, x: ndarray, y: ndarray, z: ndarray, scorer: FootprintScorer, max_score: int,
+                     building, size: Size, shift: Coordinates) -> ndarray:
+        """Return the scores evaluating the fitness of a building whose entrance is placed on each of the
+            blocks at the given [x], [y], [z] coordinates. The lower the score, the better it fits
 
             Score is calculated as follows :
             malus depending on the distance from the center of the area +
-            Sum of all differences in the y coordinate
+            Sum of the costs of the foundations and of the digging under the building
             """
-
-        if coordinates in self.occupied_coordinates:
-            return 100_000_000
+        footprint = scorer.score(x - self.start.x - shift.x, z - self.start.z - shift.z, y, size)
+        valid = footprint < FootprintScorer.INVALID_SCORE
 
         # apply malus to score depending on the distance to the 'center'
-
-        center = Coordinates(self.center[0], 0, self.center[1])
-        score = coordinates.as_2D().distance(center) * .1
+        scores = (np.abs(x - self.center[0]) + np.abs(z - self.center[1])) * .1
 
         # For mines : Try to place them up a cave
         if building.properties.type == BuildingType.MINING:
-            # we shift 10 blocs into the ground and search for air, because that would be a cave.
-            # y - 30 to not go too deep
-            # x and z shift to get to the center
-            for down in coordinates.shift(x=round(size.x / 2), y=-10, z=round(size.z / 2)).line(coordinates.y - 30,
-                                                                                                Direction.DOWN):
-                if self.get_block_at(*down).is_one_of('air'):
-                    depth = coordinates.y - down.y
-                    bonus = -1000
-                    score += bonus
-                    building.depth = (depth // 5) + 1
-                    break
+            scores[self.__get_cave_depths(x, z, size) > 0] -= 1000
+
             # apply malus, the idea is that the bonus will compensate for it, so mine without bonus should be less frequent
-            score += best_current_score / 2
+            scores += max_score / 2
 
         # For tower : place them as high as possible
         elif building.name == 'Tower':
-            score -= (100 - coordinates.y) * 2
-
-        # Score = sum of difference between the first point's altitude and the other
-        for x in range(size.x):
-            for z in range(size.z):
-                current_coord = coordinates.shift(x - shift.x, 0 - shift.y, z - shift.z)
-                current_block = surface.find(current_coord)
-
-                if not current_block or current_block.coordinates in self.occupied_coordinates:
-                    return 100_000_000
-
-                if current_block.is_one_of('water'):
-                    # little malus to push it to generate on land
-                    score += .5
-
-                # putting foundation isn't a problem compared to digging in the terrain, so we apply a
-                # worsening factor to digging
-                to_add = coordinates.y - current_block.coordinates.y
-                # placing foundation
-                if to_add > 0:
-                    score += int(to_add * .8)
-                # digging (bad)
-                else:
-                    score += abs(to_add) * 3
-
-                # Return earlier if score is already too bad
-                if score >= best_current_score:
-                    return max_score
+            scores -= (100 - y) * 2
 
-        # add malus due to bad road connectivity
-        if city_buildings:
+        return np.where(valid, scores + footprint, FootprintScorer.INVALID_SCORE)
 
-            # try:
-            #     path = nx.dijkstra_path(self.graph, city_buildings[0].entrance, coordinates)
-            #     malus = -10
-            # except nx.NetworkXException:
-            #     malus = max_score / 5
+    def __get_cave_depths(self, x: ndarray, z: ndarray, size: Size) -> ndarray:
+        """Return the depths of the caves found under the center of a building of the given [size] whose
+        entrance is placed at the given [x], [z] coordinates, 0 meaning that there is no cave"""
+        depths = env.HEIGHTMAPS.get_cave_depths()
 
-            horizontal_directions = (Direction.SOUTH, Direction.WEST, Direction.NORTH, Direction.SOUTH)
-            for _dir in horizontal_directions:
-                line = list(coordinates.line(6, _dir))
-                for u, v in zip(line[:-2], line[1:]):
-                    if not self.graph.has_edge(u, v):
-                        return max_score
+        # x and z shift to get to the center
+        x = x + round(size.x / 2) - env.VOXELS.origin.x
+        z = z + round(size.z / 2) - env.VOXELS.origin.z
 
-            # score += malus
+        inside = (x >= 0) & (x < depths.shape[0]) & (z >= 0) & (z < depths.shape[1])
+        return np.where(inside, depths[np.clip(x, 0, depths.shape[0] - 1), np.clip(z, 0, depths.shape[1] - 1)], 0)
 
-        if score >= best_current_score:
-            return max_score
+    def __is_reachable(self, coordinates: Coordinates) -> bool:
+        """Return true if it is possible to walk away from the given [coordinates] in every direction"""
+        horizontal_directions = (Direction.SOUTH, Direction.WEST, Direction.NORTH, Direction.SOUTH)
+        for _dir in horizontal_directions:
+            line = list(coordinates.line(6, _dir))
+            for u, v in zip(line[:-2], line[1:]):
+                if not self.pathfinder.has_edge(u, v):
+                    return False
 
-        # And now modifications for specials buildings
-        # relation = env.RELATIONS.get_building_relation(building.name)
-
-        score_modif = 0
-        # if relation and city_buildings:
-        #     score_modif = max(list(map(lambda build: relation.get_building_value(build.name), filter(
-        #         lambda b: b.plot.start.distance(coordinates) < 50, city_buildings))) + [0])
-        # TODO refactor relations!
-
-        return score + score_modif
+        return True
 
 
 class RoadPlot(LogicPlot):
@@ -578,56 +629,61 @@ class RoadPlot(LogicPlot):
         super().__init__(x, y, z, size)
 
     def equalize_roads(self):
+        """Compute the height of the road at each block of the plot, which is the average height of the
+        surface under the roads found in the 11x11 square around the block"""
         if len(self.all_roads) < 1:
             return
-        self.roads_y = dict()
-
-        for road in self.all_roads:
-            neighbors_blocks = map(lambda coord: self.get_blocks(Criteria.MOTION_BLOCKING_NO_TREES).find(coord),
-                                   filter(self.all_roads.__contains__, road.around_2d(5, y=0)))
 
-            neighbors_y = list(map(lambda block: block.coordinates.y, filter(lambda block: block, neighbors_blocks)))
+        heights = self.get_heightmap(Criteria.MOTION_BLOCKING_NO_TREES) - 1
+        roads = self.all_roads.mask
 
-            # Maybe use median if you implement marching cube like technic for placing stairs
-            # median_y = statistics.median_grouped(neighbors_y)
-            average_y = sum(neighbors_y) / max(len(neighbors_y), 1)
-
-            self.roads_y[road.as_2D()] = average_y
+        # Maybe use median if you implement marching cube like technic for placing stairs
+        # median_y = statistics.median_grouped(neighbors_y)
+        total = rasters.window_sum(np.where(roads, heights, 0), 5)
+        amount = rasters.window_sum(roads.astype(np.int64), 5)
+        self.roads_y = total / np.maximum(amount, 1)
 
     def build_roads(self, floor_pattern: dict[str, dict[str, float]], slab_pattern=None):
         self.equalize_roads()
-
-        roads = []
+        if self.roads_y is None:
+            return
 
         # clean above roads
-        for road in self.all_roads:
-            for i in range(1, 20):
-                coordinates = road.with_points(y=int(self.roads_y[road]) + i)
+        cleared = self.all_roads.mask & ~self.construction_coordinates.mask
+        bottom = np.clip(self.roads_y.astype(int) + 1, self.start.y, self.end.y + 1)
+        top = np.clip(self.roads_y.astype(int) + 19, self.start.y - 1, self.end.y)
 
-                if coordinates in self and coordinates.as_2D() not in self.construction_coordinates:
-                    roads.append(self.get_blocks(Criteria.MOTION_BLOCKING_NO_LEAVES).find(coordinates))
-                    INTF.placeBlock(*coordinates, 'air')
+        y = np.arange(bottom[cleared].min(initial=256), top[cleared].max(initial=0) + 1)
+        volume = cleared[:, np.newaxis, :] & (y[np.newaxis, :, np.newaxis] >= bottom[:, np.newaxis, :]) & \
+            (y[np.newaxis, :, np.newaxis] <= top[:, np.newaxis, :])
+
+        if volume.any():
+            # Columns above the roads are merged first
+            amount = fills.fill_mask(self.start.with_points(y=int(y[0])), volume, 'air', order=(1, 2, 0))
+            if env.DEBUG:
+                print(f'=> Cleared {np.count_nonzero(volume)} blocs above the roads with {amount} fill commands')
 
-        self.remove_trees(BlockList(roads))
+        surface = self.get_blocks(Criteria.MOTION_BLOCKING_NO_LEAVES)
+        self.remove_trees(surface.where(cleared))
 
         # place blocks
-        for key in self.roads_infos.keys():
-            for road in self.roads_infos[key]:
-                if road not in self:
-                    continue
+        for key in self.road_widths:
+            for road in self.get_road_part(key):
+                road_y = self.roads_y[self.all_roads.to_cell(road)]
+
                 # Default : place a block
                 chose_pattern = floor_pattern
                 shift = 0
 
                 # If the average block y is near half :
-                if slab_pattern and 0.5 < self.roads_y[road] - int(self.roads_y[road]):
+                if slab_pattern and 0.5 < road_y - int(road_y):
                     # place a slab
                     chose_pattern = slab_pattern
                     shift = 1
                     if road.as_2D() in self.construction_coordinates:
                         continue
 
-                x, y, z = (road.with_points(y=int(self.roads_y[road]) + shift))
+                x, y, z = (road.with_points(y=int(road_y) + shift))
                 if road.as_2D() in self.construction_coordinates:
                     if not self.get_block_at(x, y, z).is_one_of(('air', 'grass', 'snow', 'sand', 'stone')):
                         continue
@@ -650,65 +706,24 @@ class RoadPlot(LogicPlot):
 
         INTF.sendBlocks()
 
-    def __add_road_block(self, coordinates: Coordinates, placement: str):
-
-        road_coord = coordinates.as_2D()
-
-        delete = False
-        for key in self.roads_infos:
-            if key == placement:
-                if road_coord not in self.__recently_added_roads[placement]:
-                    self.roads_infos[key][road_coord] += 1
-                delete = True
-            else:
-                if road_coord in self.roads_infos[key]:
-                    if delete:
-                        self.roads_infos[key].pop(road_coord)
-                    else:
-                        return
-
-        self.__recently_added_roads[placement].add(road_coord)
-        self.all_roads.add(road_coord)
-        self.occupied_coordinates.add(road_coord)
+    def get_road_part(self, key: str) -> OccupancyLayer:
+        """Return the layer of the cells whose most important road part is the one of the given [key]"""
+        index = list(self.road_widths).index(key) + 1
+        return OccupancyLayer(self.start, self.size, self.road_parts == index)
 
     def compute_roads(self, start: Coordinates, end: Coordinates) -> bool:
         time_start = time.time()
-        if self.graph is None:
-            self.fill_graph()
+        if self.pathfinder is None:
+            self.build_pathfinder()
 
         start = b.coordinates if (b := self.get_blocks(Criteria.MOTION_BLOCKING_NO_TREES).find(start)) else start
         end = b.coordinates if (b := self.get_blocks(Criteria.MOTION_BLOCKING_NO_TREES).find(end)) else end
 
-        try:
-            path = nx.dijkstra_path(self.graph, start, end)
-        except nx.NetworkXException:
+        path = self.pathfinder.find_path(start, end)
+        if path is None:
             return False
 
-        self.__recently_added_roads = {'INNER': set(), 'MIDDLE': set(), 'OUTER': set()}
-        for coord in path:
-            # INNER PART
-            self.__add_road_block(coord, 'INNER')
-
-            # MIDDLE PART
-            self.__add_road_block(coord.shift(x=1), 'MIDDLE')
-            self.__add_road_block(coord.shift(x=-1), 'MIDDLE')
-            self.__add_road_block(coord.shift(z=1), 'MIDDLE')
-            self.__add_road_block(coord.shift(z=-1), 'MIDDLE')
-
-            # OUTER PART
-            self.__add_road_block(coord.shift(x=1, z=1), 'OUTER')
-            self.__add_road_block(coord.shift(x=-1, z=1), 'OUTER')
-            self.__add_road_block(coord.shift(x=1, z=-1), 'OUTER')
-            self.__add_road_block(coord.shift(x=-1, z=-1), 'OUTER')
-            self.__add_road_block(coord.shift(x=2), 'OUTER')
-            self.__add_road_block(coord.shift(x=-2), 'OUTER')
-            self.__add_road_block(coord.shift(z=2), 'OUTER')
-            self.__add_road_block(coord.shift(z=-2), 'OUTER')
-
-        # Update weights to use the roads
-        for c1, c2 in zip(path[:-2], path[1:]):
-            if self.graph.has_edge(c1, c2):
-                self.graph[c1][c2]['weight'] = 10
+        self.__add_road(path)
 
         if env.SHOW_TIME:
             time_took = time.time() - time_start
@@ -716,16 +731,67 @@ class RoadPlot(LogicPlot):
 
         return True
 
+    def connect_to_roads(self, start: Coordinates, entrances: list[Coordinates]) -> bool:
+        """Compute the road linking [start] to the closest block of the existing road network, or to the
+        closest of the given [entrances] if it is reached first. Only one search is made"""
+        time_start = time.time()
+        if self.pathfinder is None:
+            self.build_pathfinder()
+
+        start = b.coordinates if (b := self.get_blocks(Criteria.MOTION_BLOCKING_NO_TREES).find(start)) else start
+
+        targets = self.all_roads.mask.copy()
+        for coordinates in entrances:
+            if (cell := self.pathfinder.to_cell(coordinates)) is not None:
+                targets[cell] = True
+
+        path = self.pathfinder.find_path_to_nearest(start, targets)
+        if path is None:
+            return False
+
+        self.__add_road(path)
+
+        if env.SHOW_TIME:
+            time_took = time.time() - time_start
+            print(f'Computed road from {start} to {path[-1]} in {time_took:.2f} s.')
+
+        return True
+
+    def __add_road(self, path: list[Coordinates]) -> None:
+        """Add the road following the given [path] to the plot, with its middle and outer parts"""
+        path_mask = self.layers.new_layer()
+        for coordinates in path:
+            path_mask.add(coordinates)
+
+        # The parts of the new road are stamped from the least to the most important one
+        parts = np.zeros_like(self.road_parts)
+        for index, width in reversed(list(enumerate(self.road_widths.values(), 1))):
+            parts[rasters.dilate(path_mask.mask, width)] = index
+
+        stamped = parts > 0
+        better = stamped & ((self.road_parts == 0) | (parts < self.road_parts))
+        same = stamped & (parts == self.road_parts)
+
+        self.road_counts[better] = 1
+        self.road_counts[same] += 1
+        self.road_parts[better] = parts[better]
+
+        self.all_roads.mask |= stamped
+        self.occupied_coordinates.mask |= stamped
+
+        # Update weights to use the roads
+        self.pathfinder.add_road(path)
+
     def add_roads_signs(self, amount: int, buildings: list):
-        if not self.roads_y:
+        if self.roads_y is None:
             self.equalize_roads()
 
         max_sign_height = min(5, len(buildings))
         min_sign_height = 2
         if len(buildings) <= min_sign_height:
             return
-        for block in random.sample(self.all_roads, amount):
-            block = block.with_points(y=round(self.roads_y[block]) + 1)
+        for block in random.sample(list(self.all_roads), amount):
+            block = block.with_points(y=round(self.roads_y[self.all_roads.to_cell(block)]) + 1)
             for i, build in enumerate(random.sample(buildings, random.randint(min_sign_height, max_sign_height))):
                 if build.entrance is None:
                     continue
@@ -740,13 +806,11 @@ class RoadPlot(LogicPlot):
         colors = ('lime', 'white', 'pink', 'yellow', 'orange', 'red', 'magenta', 'purple', 'black')
         materials = ('concrete', 'wool', 'stained_glass')
         self.equalize_roads()
-        for i, key in enumerate(self.roads_infos):
-            for road in self.roads_infos[key]:
-                block = self.get_blocks(Criteria.MOTION_BLOCKING_NO_TREES).find(
-                    road)  # to be sure that we are in the plot
-                if block:
-                    INTF.placeBlock(*(road.with_points(y=self.roads_y[road] + y_offset)),
-                                    colors[min(self.roads_infos[key][road], len(colors)) - 1] + '_' + materials[i])
+        for i, key in enumerate(self.road_widths):
+            for road in self.get_road_part(key):
+                cell = self.all_roads.to_cell(road)
+                INTF.placeBlock(*(road.with_points(y=self.roads_y[cell] + y_offset)),
+                                colors[min(self.road_counts[cell], len(colors)) - 1] + '_' + materials[i])
 
         INTF.sendBlocks()
 
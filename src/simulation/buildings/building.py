@@ -33,6 +33,7 @@ from src.utils.coordinates import Coordinates, Size
 
 from src.simulation.buildings.utils.building_properties import BuildingProperties
 from src.utils.loot_table import MinecraftItem
+from src.world import sender
 
 
 class Blueprint(ABC):
@@ -200,7 +201,7 @@ class Blueprint(ABC):
         entrances = self.structures[0].blocks.filter('emerald')
         if not entrances:
             return Coordinates(0, 0, 0)  # plot start
-        return entrances[0].coordinates.rotate(rotation, compense_shift_size=self.get_size())
+        return entrances[0].coordinates.rotate(rotation, compense_shift_size=self.structures[0].get_size(rotation))
 
     def _find_entrance(self, start: Coordinates) -> Coordinates | None:
         """"""
@@ -327,7 +328,7 @@ class Graveyard(BuildingWithSlots):
             x, y, z = slot.coordinates
             INTERFACE.placeBlock(x, y - 1, z, 'air')
             INTERFACE.placeBlock(x, y - 2, z, 'air')
-            INTERFACE.sendBlocks()
+            sender.flush()
             INTERFACE.runCommand(f'summon zombie {x} {y - 2} {z} {{CustomName:"\\"{villager.name}\\""}}')
 
 
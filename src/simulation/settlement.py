@@ -4,7 +4,7 @@ from collections import Counter, defaultdict
 from typing import Any, DefaultDict, Iterator, MutableMapping
 
 from colorama import Fore
-from gdpc import interface, lookup, toolbox
+from gdpc import interface, lookup
 
 from src import env
 from src.blocks.block import Block
@@ -13,9 +13,9 @@ from src.utils import chest, loot_table
 from src.utils.book_maker import BookMaker
 from src.utils.criteria import Criteria
 from src.simulation.villager import Villager
-from src.blocks.collections.block_list import BlockList
 from src.simulation.buildings.building import Building, Graveyard, WeddingTotem
 from src.utils.loot_table import MinecraftItem
+from src.world import sender
 
 
 class Settlement(MutableMapping):
@@ -154,8 +154,11 @@ class Settlement(MutableMapping):
         if not self.is_running:
             return False
 
-        plot = self.plot.get_subplot(building, building.rotation,
-                                     max_score, city_buildings=self.chronology)
+        if env.EXHAUSTIVE_PLACEMENT:
+            plot = self.plot.get_best_subplot(building, max_score, city_buildings=self.chronology)
+        else:
+            plot = self.plot.get_subplot(building, building.rotation,
+                                         max_score, city_buildings=self.chronology)
 
         if plot is None:
             self.__add_no_build()
@@ -180,18 +183,23 @@ class Settlement(MutableMapping):
         elif isinstance(building, WeddingTotem):
             self.wedding_totem = building
 
-        area_with_padding = BlockList(
-            list(map(lambda coord: self.plot.get_blocks(Criteria.MOTION_BLOCKING_NO_LEAVES).find(coord),
-                     filter(lambda coord: coord in self.plot, plot.surface(building.properties.padding)))))
+        padding = building.properties.padding
+        area_with_padding = self.plot.get_blocks(Criteria.MOTION_BLOCKING_NO_LEAVES).crop(
+            plot.start.shift(x=-padding, z=-padding), plot.size + 2 * padding)
 
         plot.remove_trees(area_with_padding)
 
+        unchanged_writes = interface.globalinterface.unchanged_writes
         plot.build_foundation(self.plot)
 
         print(f'{building} added to the settlement')
 
         building.build(plot, self.plot)
 
+        if env.DEBUG:
+            skipped = interface.globalinterface.unchanged_writes - unchanged_writes
+            print(f'=> Skipped {skipped} block placements of {building} already matching the world')
+
         self.chronology.append(building)
 
         if building.name not in self._buildings_cache:
@@ -201,17 +209,10 @@ class Settlement(MutableMapping):
 
         if len(self._buildings) > 1 and not self.chronology[-1].properties.is_extension:
             if env.DEBUG:
-                print(f'building road from {self.chronology[0]} to {self.chronology[1]}')
-
-            road_done = False
-            i = 0
-            max_i = len(self._buildings) - 1
-            while not road_done and i < max_i:
-                end = self.chronology[i].entrance
-                start = self.chronology[-1].entrance
+                print(f'building road from {self.chronology[-1]} to the road network')
 
-                road_done = self.plot.compute_roads(start, end)
-                i += 1
+            entrances = [building.entrance for building in self.chronology[:-1] if building.entrance is not None]
+            self.plot.connect_to_roads(self.chronology[-1].entrance, entrances)
 
     def update(self, year: int) -> None:
         """Update the settlement's indicators"""
@@ -335,7 +336,7 @@ class Settlement(MutableMapping):
         chest_string = f'minecraft:chest'
         interface.placeBlock(*coord, chest_string)
         print(f'Treasure Chest at {coord}')
-        interface.sendBlocks()
+        sender.flush()
         interface.runCommand(f'data merge block {coord.x} {coord.y} {coord.z} {chest_data}')
         return coord
 
@@ -360,7 +361,7 @@ class Settlement(MutableMapping):
             if len(lectern_list):
                 lectern: Block = lectern_list[0]
                 interface.placeBlock(*lectern.coordinates, 'air')
-                toolbox.placeLectern(*lectern.coordinates, book_data, facing=lectern.properties['facing'])
+                self.__place_lectern(lectern, book_data)
 
         # make a book
         text = '\n\n'.join(self.city_history)
@@ -368,13 +369,22 @@ class Settlement(MutableMapping):
         lectern_list = self._buildings['Town Hall'][0].blocks[self._buildings['Town Hall'][0].structures[0]].filter('lectern')
         if len(lectern_list):
             lectern: Block = lectern_list[0]
-            toolbox.placeLectern(*lectern.coordinates, book_data, facing=lectern.properties['facing'])
+            self.__place_lectern(lectern, book_data)
 
         interface.setBuffering(True)
         interface.sendBlocks()
 
+    def __place_lectern(self, lectern: Block, book_data: str) -> None:
+        """Place a lectern holding the given book at the coordinates of the given [lectern] block. Unlike the
+        GDPC toolbox, the lectern is placed through the global interface, so it is known to the local copy"""
+        coords = lectern.coordinates
+        interface.placeBlock(*coords, f'lectern[facing={lectern.properties["facing"]}, has_book=true]')
+        sender.flush()
+        interface.runCommand(f'data merge block {coords.x} {coords.y} {coords.z} '
+                             f'{{Book: {{id: "minecraft:written_book", Count: 1b, tag: {book_data}}}, Page: 0}}')
+
     def add_flowers(self):
-        coords = set([coord.as_2D() for coord in self.plot.surface()]) - self.plot.occupied_coordinates
+        coords = list(~self.plot.occupied_coordinates)
         surface = self.plot.get_blocks(Criteria.WORLD_SURFACE)
         #
         chosen_coords = random.sample(coords, k=math.ceil(0.30 * len(coords)))
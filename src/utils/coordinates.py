@@ -12,6 +12,7 @@ from gdpc import interface
 from nbt.nbt import TAG_List
 
 from src.utils.direction import Direction
+from src.world import sender
 
 
 def R(a: float):
@@ -145,7 +146,7 @@ class Coordinates:
         data += f'Text4:\'{{"text":"{texts[3]}"}}\'' + "}"
         if replace_block:
             interface.placeBlock(self.x, self.y, self.z, f'oak_sign[rotation={rotation}]')
-        interface.sendBlocks()
+        sender.flush()
         interface.runCommand(f"data merge block {self.x} {self.y} {self.z} {data}")
 
     def angle(self, other: Coordinates):
@@ -18,3 +18,6 @@ class Criteria(Enum):
 
     # Like MOTION_BLOCKING_NO_LEAVES but ignoring logs
     MOTION_BLOCKING_NO_TREES = 4
+
+    # Like MOTION_BLOCKING_NO_TREES but also ignoring plants and snow layers
+    MOTION_BLOCKING_NO_PLANTS = 5
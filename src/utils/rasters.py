@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+from typing import Callable
+
+import numpy as np
+
+
+def window_delta_sum(values: np.ndarray, radius: int) -> np.ndarray:
+    """Return, for each cell of the 2D integer [values] whose square window of the given [radius] fits
+    in the array, the sum of the absolute differences between the cell and its window. The cost depends on
+    the number of distinct values, not on the radius"""
+    size_x, size_z = values.shape
+    side = 2 * radius + 1
+    inner = values[radius:size_x - radius, radius:size_z - radius].astype(np.int64)
+
+    # For a cell of value h, the sum is h * (2 * count - side²) + total - 2 * sum, where count and sum are
+    # the number and the sum of the values of its window lower than h
+    lower_count = np.zeros(inner.shape, dtype=np.int64)
+    lower_sum = np.zeros(inner.shape, dtype=np.int64)
+
+    for level in np.unique(inner).tolist():
+        x, z = np.nonzero(inner == level)
+        below = values < level
+        lower_count[x, z] = box_sum(integral_image(below), x, z, side, side)
+        lower_sum[x, z] = box_sum(integral_image(np.where(below, values, 0)), x, z, side, side)
+
+    total = box_sum(integral_image(values), *np.indices(inner.shape), side, side)
+    return inner * (2 * lower_count - side * side) + total - 2 * lower_sum
+
+
+def integral_image(values: np.ndarray) -> np.ndarray:
+    """Return the summed-area table of the 2D [values]. The table has a leading row and column of
+    zeros, so that the sum of any rectangle of values can be read with four lookups"""
+    table = np.zeros((values.shape[0] + 1, values.shape[1] + 1), dtype=np.int64)
+    table[1:, 1:] = np.cumsum(np.cumsum(values, axis=0, dtype=np.int64), axis=1)
+    return table
+
+
+def box_sum(table: np.ndarray, x: np.ndarray | int, z: np.ndarray | int, size_x: int, size_z: int) -> np.ndarray | int:
+    """Return, using the summed-area [table], the sums of the values of the rectangles of the given
+    size whose first cells are at [x], [z]. The positions may be given as arrays"""
+    return table[x + size_x, z + size_z] - table[x, z + size_z] - table[x + size_x, z] + table[x, z]
+
+
+def flood_fill(seeds: np.ndarray, accept: Callable[[np.ndarray], np.ndarray], shape: tuple[int, ...],
+               offsets: list[tuple[int, ...]]) -> np.ndarray:
+    """Return the indices, as rows, of the cells reached from the [seeds] cells by steps of one of the [offsets]
+    without leaving an array of the given [shape]. Only the cells for which the [accept] function, given rows
+    of indices, returns true are entered. The work done only depends on the number of cells reached"""
+    visited = np.zeros(shape, dtype=bool)
+    frontier = np.unique(np.asarray(seeds, dtype=int).reshape(-1, len(shape)), axis=0)
+    visited[tuple(frontier.T)] = True
+
+    reached = [frontier]
+    steps = np.array(offsets, dtype=int)
+    while len(frontier):
+        cells = (frontier[:, np.newaxis, :] + steps[np.newaxis, :, :]).reshape(-1, len(shape))
+        cells = cells[np.all((cells >= 0) & (cells < shape), axis=1)]
+
+        # Each cell is only entered once, even when reached from several cells of the frontier
+        flat = np.unique(np.ravel_multi_index(tuple(cells.T), shape))
+        cells = np.stack(np.unravel_index(flat[~visited.flat[flat]], shape), axis=1)
+        cells = cells[accept(cells)]
+
+        visited[tuple(cells.T)] = True
+        reached.append(cells)
+        frontier = cells
+
+    return np.concatenate(reached)
+
+
+def cuboids(mask: np.ndarray, order: tuple[int, int, int] = (0, 2, 1)) -> list[tuple[tuple[int, int, int], tuple[int, int, int]]]:
+    """Return a list of disjoint cuboids exactly covering the true cells of the 3D [mask]. Each cuboid is
+    given by the indices of its first and last cells. Cuboids are grown greedily along the axes in the
+    given [order], which is x, then z, then y by default"""
+    axes = (order[0], order[2], order[1])
+    remaining = mask.transpose(axes).copy()
+    size_a, size_c, size_b = remaining.shape
+    boxes = []
+
+    for a, c, b in zip(*np.nonzero(remaining)):
+        if not remaining[a, c, b]:
+            continue
+
+        end_a = a
+        while end_a + 1 < size_a and remaining[end_a + 1, c, b]:
+            end_a += 1
+
+        end_b = b
+        while end_b + 1 < size_b and remaining[a:end_a + 1, c, end_b + 1].all():
+            end_b += 1
+
+        end_c = c
+        while end_c + 1 < size_c and remaining[a:end_a + 1, end_c + 1, b:end_b + 1].all():
+            end_c += 1
+
+        remaining[a:end_a + 1, c:end_c + 1, b:end_b + 1] = False
+
+        # Indices are given back in the order of the axes of the mask
+        first, last = [0] * 3, [0] * 3
+        for axis, start, end in zip(axes, (a, c, b), (end_a, end_c, end_b)):
+            first[axis], last[axis] = int(start), int(end)
+        boxes.append((tuple(first), tuple(last)))
+
+    return boxes
+
+
+def window_sum(values: np.ndarray, radius: int) -> np.ndarray:
+    """Return, for each cell of the 2D [values], the sum of the values of the square window of the given
+    [radius] centered on the cell. The parts of the windows outside of the array are ignored"""
+    table = integral_image(np.pad(values, radius))
+    size_x, size_z = values.shape
+    x, z = np.indices((size_x, size_z))
+    return box_sum(table, x, z, 2 * radius + 1, 2 * radius + 1)
+
+
+def dilate(mask: np.ndarray, radius: int) -> np.ndarray:
+    """Return the 2D boolean [mask] dilated by a diamond of the given [radius], that is the cells whose
+    manhattan distance to a true cell of the [mask] is at most [radius]. A radius of 1 is a cross"""
+    dilated = mask.copy()
+    for _ in range(radius):
+        grown = dilated.copy()
+        grown[1:] |= dilated[:-1]
+        grown[:-1] |= dilated[1:]
+        grown[:, 1:] |= dilated[:, :-1]
+        grown[:, :-1] |= dilated[:, 1:]
+        dilated = grown
+    return dilated
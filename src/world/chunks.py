@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from math import ceil, log2
+
+import numpy as np
+import requests
+from gdpc import direct_interface as DI
+from gdpc.bitarray import BitArray
+from gdpc.worldLoader import CachedSection, WorldSlice
+from nbt.nbt import MalformedFileError, NBTFile, TAG_Compound
+
+
+# Endpoint of the GDMC HTTP server returning the chunks of an area
+CHUNKS_URL = 'http://localhost:9000/chunks'
+
+# Directory in which the fetched tiles of chunks are cached, one sub-directory per day of the world
+CACHE_DIRECTORY = '.cache/chunks'
+
+# Number of chunks on each side of the tiles fetched in parallel
+TILE_SIZE = 4
+
+# Number of tiles fetched at the same time
+WORKERS = 8
+
+# Number of times the fetch of a tile is tried, the waiting time doubling after each failure
+RETRIES = 5
+
+# Time waited after the first failure to fetch a tile, in seconds
+BACKOFF = .5
+
+# Chunks written since the world was loaded, whose cached tiles have already been deleted
+_invalidated: set[tuple[int, int]] = set()
+
+
+class ChunkedWorldSlice(WorldSlice):
+    """World slice built from chunks fetched beforehand instead of a single request to the server"""
+
+    def __init__(self, x1: int, z1: int, x2: int, z2: int, chunks: dict[tuple[int, int], TAG_Compound],
+                 heightmap_types: tuple[str, ...] = ('MOTION_BLOCKING', 'MOTION_BLOCKING_NO_LEAVES', 'OCEAN_FLOOR',
+                                                     'WORLD_SURFACE')):
+        """Parameterised constructor creating a new slice between x1, z1 and x2, z2, both excluded, from the
+        given [chunks] mapped to their chunk coordinates. The attributes are the same as the GDPC slices"""
+        self.rect = x1, z1, x2 - x1, z2 - z1
+        self.chunkRect = chunk_rect(x1, z1, x2, z2)
+        self.heightmapTypes = list(heightmap_types)
+
+        chunk_x, chunk_z, size_x, size_z = self.chunkRect
+        # Chunks are ordered along x, then along z, like in the response of the server
+        self.nbtfile = {'Chunks': [chunks[chunk_x + x, chunk_z + z] for z in range(size_z) for x in range(size_x)]}
+
+        offset_x, offset_z = self.rect[0] % 16, self.rect[1] % 16
+        self.heightmaps = {name: np.zeros((self.rect[2] + 1, self.rect[3] + 1), dtype=int) for name in heightmap_types}
+        self.sections = [[[None] * 16 for _ in range(size_z)] for _ in range(size_x)]
+
+        for x in range(size_x):
+            for z in range(size_z):
+                level = self.nbtfile['Chunks'][x + z * size_x]['Level']
+
+                for name in heightmap_types:
+                    values = BitArray(9, 16 * 16, level['Heightmaps'][name])
+                    heightmap = self.heightmaps[name]
+
+                    # Same indexing as the GDPC slices, for the heightmaps to be identical
+                    for cz in range(16):
+                        for cx in range(16):
+                            try:
+                                heightmap[x * 16 + cx - offset_x, z * 16 + cz - offset_z] = values.getAt(cz * 16 + cx)
+                            except IndexError:
+                                pass
+
+                for section in level['Sections']:
+                    if 'BlockStates' not in section or len(section['BlockStates']) == 0:
+                        continue
+
+                    palette = section['Palette']
+                    bits = max(4, ceil(log2(len(palette))))
+                    self.sections[x][z][section['Y'].value] = \
+                        CachedSection(palette, BitArray(bits, 16 * 16 * 16, section['BlockStates']))
+
+
+def chunk_rect(x1: int, z1: int, x2: int, z2: int) -> tuple[int, int, int, int]:
+    """Return the first chunk coordinates and the number of chunks along each axis covering the area between
+    x1, z1 and x2, z2, both excluded"""
+    return x1 >> 4, z1 >> 4, ((x2 - 1) >> 4) - (x1 >> 4) + 1, ((z2 - 1) >> 4) - (z1 >> 4) + 1
+
+
+def load_world_slice(x1: int, z1: int, x2: int, z2: int) -> WorldSlice:
+    """Return the world slice between x1, z1 and x2, z2, both excluded. The chunks are fetched by tiles, several
+    at a time, and the tiles already fetched during the same day of the world are read from the cache"""
+    chunk_x, chunk_z, size_x, size_z = chunk_rect(x1, z1, x2, z2)
+    tiles = [(x, z, min(TILE_SIZE, chunk_x + size_x - x), min(TILE_SIZE, chunk_z + size_z - z))
+             for x in range(chunk_x, chunk_x + size_x, TILE_SIZE) for z in range(chunk_z, chunk_z + size_z, TILE_SIZE)]
+
+    directory = _get_cache_directory()
+    _invalidated.clear()
+
+    chunks = {}
+    with ThreadPoolExecutor(WORKERS) as executor:
+        for tile, tile_chunks in zip(tiles, executor.map(lambda tile: _load_tile(tile, directory), tiles)):
+            x, z, dx, dz = tile
+            for index, chunk in enumerate(tile_chunks):
+                chunks[x + index % dx, z + index // dx] = chunk
+
+    return ChunkedWorldSlice(x1, z1, x2, z2, chunks)
+
+
+def invalidate(x: int, z: int) -> None:
+    """Delete the cached tiles containing the chunk of the block at the given x, z coordinates, once per chunk
+    until the world is loaded again. Must be called when a block is placed in the world"""
+    chunk = x >> 4, z >> 4
+    if chunk in _invalidated:
+        return
+
+    _invalidated.add(chunk)
+    if not os.path.isdir(CACHE_DIRECTORY):
+        return
+
+    for day in os.listdir(CACHE_DIRECTORY):
+        for file in os.listdir(os.path.join(CACHE_DIRECTORY, day)):
+            tile_x, tile_z, dx, dz = map(int, file.split('.')[0].split('_'))
+            if tile_x <= chunk[0] < tile_x + dx and tile_z <= chunk[1] < tile_z + dz:
+                os.remove(os.path.join(CACHE_DIRECTORY, day, file))
+
+
+def _get_cache_directory() -> str | None:
+    """Return the cache directory of the current day of the world, or None if it could not be queried"""
+    response = DI.runCommand('time query day')
+    if not (match := re.search(r'-?\d+', response or '')):
+        return None
+
+    directory = os.path.join(CACHE_DIRECTORY, match.group())
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+
+def _load_tile(tile: tuple[int, int, int, int], directory: str | None) -> list[TAG_Compound]:
+    """Return the chunks of the given [tile], from the cache [directory] if possible. Failing requests are
+    tried again after waiting longer and longer. Chunks are ordered along x, then along z"""
+    path = os.path.join(directory, '{}_{}_{}_{}.nbt'.format(*tile)) if directory else None
+
+    if path and os.path.isfile(path):
+        with open(path, 'rb') as file:
+            try:
+                return list(NBTFile(buffer=BytesIO(file.read()))['Chunks'])
+            except MalformedFileError:
+                pass
+
+    for attempt in range(RETRIES):
+        try:
+            content = _request_tile(tile)
+            chunks = list(NBTFile(buffer=BytesIO(content))['Chunks'])
+        except (requests.RequestException, MalformedFileError, KeyError):
+            if attempt == RETRIES - 1:
+                raise Exception(f'Could not fetch the chunks {tile} in {RETRIES} tries')
+            time.sleep(BACKOFF * 2 ** attempt)
+            continue
+
+        if path:
+            with open(path, 'wb') as file:
+                file.write(content)
+        return chunks
+
+
+def _request_tile(tile: tuple[int, int, int, int]) -> bytes:
+    """Return the raw chunks of the given [tile] sent by the server. Raise a requests.HTTPError if the server
+    answered with an error, instead of returning the error message like GDPC does"""
+    x, z, dx, dz = tile
+    response = requests.get(CHUNKS_URL, params={'x': x, 'z': z, 'dx': dx, 'dz': dz},
+                            headers={'Accept': 'application/octet-stream'})
+    response.raise_for_status()
+    return response.content
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import numpy as np
+from gdpc import interface as INTF
+
+from src.utils import rasters
+from src.utils.coordinates import Coordinates
+from src.world import sender, shadow
+
+
+# Maximum number of blocks a single fill command may change
+FILL_LIMIT = 32_768
+
+
+def fill_commands(start: Coordinates, end: Coordinates, block: str) -> list[str]:
+    """Return the fill commands replacing the cuboid between the [start] and [end] coordinates, both
+    included, with the given [block]. Cuboids too large for a single command are split"""
+    (x1, x2), (y1, y2), (z1, z2) = (sorted(pair) for pair in zip(start, end))
+
+    step_y = min(y2 - y1 + 1, max(FILL_LIMIT // (z2 - z1 + 1), 1))
+    step_x = max(FILL_LIMIT // (step_y * (z2 - z1 + 1)), 1)
+
+    return [f'fill {x} {y} {z1} {min(x + step_x - 1, x2)} {min(y + step_y - 1, y2)} {z2} {block}'
+            for x in range(x1, x2 + 1, step_x) for y in range(y1, y2 + 1, step_y)]
+
+
+def fill_mask(origin: Coordinates, mask: np.ndarray, block: str, order: tuple[int, int, int] = (0, 2, 1)) -> int:
+    """Replace the blocks corresponding to the true cells of the 3D [mask], indexed as [x, y, z] relatively
+    to the [origin] coordinates, with the given [block]. The cells are covered with cuboids grown along the
+    axes in the given [order], that are sent as fill commands in a single request. Return the number of
+    fill commands"""
+    shadow.write_mask(origin, mask, block)
+
+    commands = []
+    for start, end in rasters.cuboids(mask, order):
+        commands += fill_commands(origin.shift(*start), origin.shift(*end), block)
+
+    return run_commands(commands)
+
+
+def fill_cuboids(cuboids: list[tuple[Coordinates, Coordinates, str]]) -> int:
+    """Replace the blocks of each of the given [cuboids], between its start and end coordinates both included,
+    with its block. The cuboids are sent as fill commands in a single request. Return the number of commands"""
+    commands = []
+    for start, end, block in cuboids:
+        lower, upper = Coordinates(*map(min, start, end)), Coordinates(*map(max, start, end))
+        shadow.write_mask(lower, np.ones(tuple(upper.shift(1, 1, 1) - lower), dtype=bool), block)
+        commands += fill_commands(start, end, block)
+
+    return run_commands(commands)
+
+
+def run_commands(commands: list[str]) -> int:
+    """Queue the given [commands] to be run in a single request, after the blocks waiting in the buffer
+    have been placed. Without buffering, wait until they are run. Return the number of commands"""
+    if commands:
+        # Blocks still in the buffer must be placed before the commands
+        INTF.sendBlocks()
+        sender.submit(commands)
+
+        # Blocks placed directly are not queued, so they must not overtake the commands
+        if not INTF.isBuffering():
+            sender.flush()
+
+    return len(commands)
@@ -0,0 +1,250 @@
+from __future__ import annotations
+
+from collections import Counter
+from dataclasses import dataclass
+
+import numpy as np
+from gdpc import lookup
+from gdpc.worldLoader import WorldSlice
+
+from src.utils.criteria import Criteria
+from src.world.voxel_grid import VoxelGrid
+
+
+@dataclass(frozen=True)
+class CustomHeightmap:
+    """Describes a heightmap derived from one of the minecraft heightmaps by going down each column
+    until a block that is not ignored is found"""
+    base: Criteria
+
+    # Blocks whose name contain one of the patterns are ignored
+    patterns: tuple[str, ...] = ()
+
+    # Blocks whose name is one of the names are ignored
+    names: tuple[str, ...] = ()
+
+    def ignored(self, grid: VoxelGrid) -> np.ndarray:
+        """Return a boolean array telling, for each block state of the [grid] palette, if it is ignored"""
+        return grid.matching(self.patterns) | grid.matching(self.names, exact=True)
+
+
+# Blocks ignored by the MOTION_BLOCKING_NO_TREES heightmap
+_TREES = ('air', 'leaves', 'log', 'vine', 'bamboo')
+
+# Blocks without any hitbox, ignored by the minecraft heightmaps blocking motion
+_NO_HITBOX = tuple(name for name in lookup.PLANTS if name not in ('minecraft:bamboo', 'minecraft:cactus', 'minecraft:cocoa')) + \
+    lookup.TORCHES + ('minecraft:wall_torch', 'minecraft:soul_wall_torch', 'minecraft:redstone_wall_torch') + \
+    lookup.SIGNS + lookup.RAILS + lookup.PRESSUREPLATES + lookup.FIRES + \
+    ('minecraft:redstone_wire', 'minecraft:tripwire', 'minecraft:snow', 'minecraft:cobweb')
+
+# Mapping of the minecraft criteria and the names of the blocks their heightmap ignores, used to update the
+# heightmaps of the world slice after blocks have been placed
+MINECRAFT_HEIGHTMAPS: dict[Criteria, tuple[str, ...]] = {
+    Criteria.WORLD_SURFACE: lookup.AIR,
+    Criteria.MOTION_BLOCKING: lookup.AIR + _NO_HITBOX,
+    Criteria.MOTION_BLOCKING_NO_LEAVES: lookup.AIR + _NO_HITBOX + lookup.LEAVES,
+    Criteria.OCEAN_FLOOR: lookup.AIR + _NO_HITBOX + ('minecraft:water', 'minecraft:lava', 'minecraft:bubble_column',
+                                                    'minecraft:seagrass', 'minecraft:tall_seagrass', 'minecraft:kelp',
+                                                    'minecraft:kelp_plant'),
+}
+
+# Number of blocks below the surface from which caves are searched
+CAVE_SEARCH_OFFSET = 10
+
+# Lowest y coordinate at which caves are searched
+CAVE_SEARCH_FLOOR = 20
+
+# Mapping of our custom criteria and the description of their heightmap
+CUSTOM_HEIGHTMAPS: dict[Criteria, CustomHeightmap] = {
+    Criteria.MOTION_BLOCKING_NO_TREES: CustomHeightmap(Criteria.MOTION_BLOCKING_NO_LEAVES, _TREES),
+    Criteria.MOTION_BLOCKING_NO_PLANTS: CustomHeightmap(Criteria.MOTION_BLOCKING_NO_LEAVES, _TREES,
+                                                       lookup.PLANTS + ('minecraft:snow', )),
+}
+
+
+def scan_columns(ids: np.ndarray, heights: np.ndarray, ignored: np.ndarray) -> np.ndarray:
+    """Return a new heightmap where each column of the given [heights] has been lowered until the
+    first block of the [ids] volume whose state is not [ignored]. Like minecraft heightmaps, the
+    returned values are the y coordinates of the first block above the surface"""
+    size_x, size_y, size_z = ids.shape
+    heights = np.clip(heights[:size_x, :size_z], 0, size_y)
+
+    # Keep the blocks below the starting height of their column
+    kept = ~ignored[ids] & (np.arange(size_y)[np.newaxis, :, np.newaxis] < heights[:, np.newaxis, :])
+
+    # Index of the highest kept block in each column, columns without any are left at 0
+    highest = size_y - 1 - np.argmax(kept[:, ::-1, :], axis=1)
+    return np.where(kept.any(axis=1), highest + 1, 0)
+
+
+def compute_cave_depths(air: np.ndarray, heights: np.ndarray) -> np.ndarray:
+    """Return, for each column of the [air] volume, the depth of the first air block found when going down
+    from [CAVE_SEARCH_OFFSET] blocks below the surface block, whose y coordinates are given by [heights],
+    to the [CAVE_SEARCH_FLOOR]. Columns without any cave get a depth of 0"""
+    size_x, size_y, size_z = air.shape
+    heights = heights[:size_x, :size_z]
+
+    y = np.arange(size_y)[np.newaxis, :, np.newaxis]
+    searched = (y >= CAVE_SEARCH_FLOOR) & (y < heights[:, np.newaxis, :] - CAVE_SEARCH_OFFSET)
+    caves = air & searched
+
+    # Index of the highest cave block in each column
+    highest = size_y - 1 - np.argmax(caves[:, ::-1, :], axis=1)
+    return np.where(caves.any(axis=1), heights - highest, 0)
+
+
+def compute_heightmap(grid: VoxelGrid, heightmaps: dict[str, np.ndarray], criteria: Criteria) -> np.ndarray:
+    """Return the custom heightmap corresponding to the given [criteria], derived from the minecraft
+    [heightmaps] of the world slice and the blocks of the voxel [grid]"""
+    custom = CUSTOM_HEIGHTMAPS[criteria]
+    heightmap = np.copy(heightmaps[custom.base.name])
+
+    size_x, _, size_z = grid.ids.shape
+    heightmap[:size_x, :size_z] = scan_columns(grid.ids, heightmap, custom.ignored(grid))
+
+    return heightmap
+
+
+class HeightmapRegistry:
+    """Registry of the heightmaps of the current world slice. Heightmaps are computed lazily, exactly
+    once per version of the world slice, and kept until the slice is refreshed. The blocks changed in
+    the voxel grid are recorded in a journal, from which the columns of the heightmaps and of the rasters
+    derived from them are updated when next read"""
+
+    def __init__(self):
+        """Creates a new empty registry, not attached to any world slice yet"""
+        self.world: WorldSlice | None = None
+        self.grid: VoxelGrid | None = None
+
+        self.__heightmaps: dict[Criteria, np.ndarray] = {}
+        self.__cave_depths: np.ndarray | None = None
+        self.__surface_ids: dict[Criteria, np.ndarray] = {}
+
+        # Cells of the grid changed since the heightmaps were last updated
+        self.__journal: list[tuple[np.ndarray | int, np.ndarray | int, np.ndarray | int]] = []
+
+        # Number of times each heightmap has been built
+        self.builds: Counter[Criteria] = Counter()
+
+        # Revision of the registry, and revision in which each column of the grid last changed
+        self.revision = 0
+        self.revisions: np.ndarray | None = None
+
+    def refresh(self, world: WorldSlice, grid: VoxelGrid) -> None:
+        """Attach the registry to the given [world] slice and voxel [grid], dropping the heightmaps
+        computed for the previous version of the world"""
+        self.world = world
+        self.grid = grid
+        self.__heightmaps.clear()
+        self.__cave_depths = None
+        self.__surface_ids.clear()
+        self.__journal.clear()
+
+        self.revision += 1
+        self.revisions = np.full((grid.ids.shape[0], grid.ids.shape[2]), self.revision)
+
+    def record(self, x: np.ndarray | int, y: np.ndarray | int, z: np.ndarray | int) -> None:
+        """Record that the blocks of the grid at the given x, y, z indices, integers or arrays, have been changed"""
+        self.__journal.append((x, y, z))
+
+    def __replay(self) -> None:
+        """Update the columns of the heightmaps and of the rasters derived from them changed by the cells
+        recorded in the journal, starting with the minecraft heightmaps of the world slice"""
+        if not self.__journal:
+            return
+
+        x, y, z = (np.concatenate([np.atleast_1d(cells) for cells in axis]).astype(np.intp) for axis in zip(*self.__journal))
+        self.__journal.clear()
+
+        ids = self.grid.ids[x, y, z]
+        columns = np.unique(x * self.grid.ids.shape[2] + z)
+        column_x, column_z = columns // self.grid.ids.shape[2], columns % self.grid.ids.shape[2]
+
+        for criteria, names in MINECRAFT_HEIGHTMAPS.items():
+            if criteria.name not in self.world.heightmaps:
+                continue
+
+            heightmap = self.world.heightmaps[criteria.name]
+            ignored = self.grid.matching(names, exact=True)
+
+            kept = ~ignored[ids]
+            np.maximum.at(heightmap, (x[kept], z[kept]), y[kept] + 1)
+
+            # Columns whose highest block has been removed are scanned down
+            top = heightmap[column_x, column_z]
+            removed = (top > 0) & ignored[self.grid.ids[column_x, np.maximum(top - 1, 0), column_z]]
+            heightmap[column_x[removed], column_z[removed]] = scan_columns(
+                self.grid.ids[column_x[removed], :, column_z[removed]][:, :, np.newaxis],
+                top[removed][:, np.newaxis], ignored)[:, 0]
+
+        columns = self.grid.ids[column_x, :, column_z][:, :, np.newaxis]
+
+        for criteria, heightmap in self.__heightmaps.items():
+            if criteria in CUSTOM_HEIGHTMAPS:
+                custom = CUSTOM_HEIGHTMAPS[criteria]
+                base = self.world.heightmaps[custom.base.name][column_x, column_z]
+                heightmap[column_x, column_z] = scan_columns(columns, base[:, np.newaxis], custom.ignored(self.grid))[:, 0]
+
+        for criteria, surface_ids in self.__surface_ids.items():
+            heights = np.clip(self.__heightmaps[criteria][column_x, column_z] - 1, 0, self.grid.ids.shape[1] - 1)
+            surface_ids[column_x, column_z] = self.grid.ids[column_x, heights, column_z]
+
+        if self.__cave_depths is not None:
+            heights = self.get(Criteria.MOTION_BLOCKING_NO_TREES)[column_x, column_z] - 1
+            self.__cave_depths[column_x, column_z] = compute_cave_depths(
+                self.grid.matching('air')[columns], heights[:, np.newaxis])[:, 0]
+
+        self.revision += 1
+        self.revisions[column_x, column_z] = self.revision
+
+    def get(self, criteria: Criteria) -> np.ndarray:
+        """Return the heightmap of the whole world slice corresponding to the given [criteria]"""
+        self.__replay()
+        if criteria in self.__heightmaps:
+            return self.__heightmaps[criteria]
+
+        if criteria in CUSTOM_HEIGHTMAPS:
+            heightmap = compute_heightmap(self.grid, self.world.heightmaps, criteria)
+        elif criteria.name in self.world.heightmaps:
+            heightmap = self.world.heightmaps[criteria.name]
+        else:
+            raise Exception(f'Invalid criteria: {criteria}')
+
+        self.builds[criteria] += 1
+        self.__heightmaps[criteria] = heightmap
+        return heightmap
+
+    def get_cave_depths(self) -> np.ndarray:
+        """Return the raster of the depth of the first cave below each column of the voxel grid, see the
+        compute_cave_depths function. Like heightmaps, it is computed once per version of the world slice"""
+        self.__replay()
+        if self.__cave_depths is None:
+            self.__cave_depths = compute_cave_depths(self.grid.mask('air'), self.get(Criteria.MOTION_BLOCKING_NO_TREES) - 1)
+
+        return self.__cave_depths
+
+    def get_surface_ids(self, criteria: Criteria) -> np.ndarray:
+        """Return the raster of the indices in the grid palette of the surface blocks of the world slice,
+        found using the heightmap of the given [criteria]. Like heightmaps, it is computed once per version"""
+        self.__replay()
+        if criteria not in self.__surface_ids:
+            size_x, size_y, size_z = self.grid.ids.shape
+            heights = np.clip(self.get(criteria) - 1, 0, size_y - 1)
+
+            # Minecraft heightmaps have an extra row and column, mapped to the last ones of the grid
+            x, z = np.indices(heights.shape)
+            self.__surface_ids[criteria] = self.grid.ids[np.minimum(x, size_x - 1), heights, np.minimum(z, size_z - 1)]
+
+        return self.__surface_ids[criteria]
+
+    def get_revision(self, x: slice, z: slice) -> int:
+        """Return the last revision in which a column of the window of the grid given by the [x] and [z]
+        slices changed. Values computed from the columns of the window are up to date until it changes"""
+        self.__replay()
+        window = self.revisions[x, z]
+        return int(window.max()) if window.size else 0
+
+    def __str__(self) -> str:
+        """Return the string representation of the registry, with the number of builds of each heightmap"""
+        builds = ', '.join(f'{criteria.name}: {amount}' for criteria, amount in self.builds.items())
+        return f'HeightmapRegistry({builds})'
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+from collections import Counter, defaultdict
+
+import numpy as np
+
+from src.utils import rasters
+from src.utils.coordinates import Coordinates
+from src.world import fills
+
+
+# Smallest cuboid of identical blocks sent as a fill command instead of single placements
+MIN_FILL_VOLUME = 4
+
+# Side of the cubes of the world in which identical blocks are merged, bounding the memory used per cube
+MERGE_SIZE = 32
+
+# Bit of the custom flags of the GDMC HTTP server telling it to update the neighbouring blocks
+NEIGHBOUR_UPDATES = 0b1
+
+
+def updates_neighbours(flags: tuple[bool, str | None]) -> bool:
+    """Return true if blocks placed with the given [flags], the doBlockUpdates and customFlags parameters of
+    GDPC, update their neighbours like fill commands do. The custom flags take precedence when given"""
+    block_updates, custom_flags = flags
+
+    if custom_flags is not None:
+        return bool(int(custom_flags, 2) & NEIGHBOUR_UPDATES)
+    return block_updates is True
+
+
+def compress(blocks: list[tuple[int, int, int, str]]) -> tuple[list[str], list[tuple[int, int, int, str]]]:
+    """Return the fill commands covering the cuboids of identical [blocks], given as x, y, z and state, and the
+    blocks left to place one by one, in their original order. Blocks placed more than once are always left"""
+    placements = Counter((x, y, z) for x, y, z, _ in blocks)
+
+    indices = defaultdict(list)
+    for index, (x, y, z, state) in enumerate(blocks):
+        if placements[x, y, z] == 1:
+            indices[state].append(index)
+
+    commands, merged = [], []
+    for state, group in indices.items():
+        if len(group) < MIN_FILL_VOLUME:
+            continue
+
+        group = np.array(group)
+        cells = np.array([blocks[index][:3] for index in group], dtype=int)
+
+        # Blocks are merged cube by cube, so that the grids only cover the cells of a cube
+        _, cubes = np.unique(cells // MERGE_SIZE, axis=0, return_inverse=True)
+        order = np.argsort(cubes.ravel(), kind='stable')
+        bounds = np.flatnonzero(np.diff(cubes.ravel()[order])) + 1
+
+        for members in np.split(order, bounds):
+            if len(members) >= MIN_FILL_VOLUME:
+                commands += _merge(cells[members], group[members], state, merged)
+
+    if not merged:
+        return [], blocks
+
+    left = np.ones(len(blocks), dtype=bool)
+    left[np.concatenate(merged)] = False
+    return commands, [block for block, keep in zip(blocks, left.tolist()) if keep]
+
+
+def _merge(cells: np.ndarray, indices: np.ndarray, state: str, merged: list[np.ndarray]) -> list[str]:
+    """Return the fill commands covering the cuboids of the given [cells], holding blocks of the same [state].
+    The [indices] in the buffer of the blocks of the cuboids are added to the [merged] list"""
+    lower = cells.min(axis=0)
+    cells = cells - lower
+
+    # Index in the buffer of the block of each cell of the bounding box, -1 for cells without any
+    buffer_indices = np.full(tuple(cells.max(axis=0) + 1), -1, dtype=np.int32)
+    buffer_indices[tuple(cells.T)] = indices
+
+    commands = []
+    for start, end in rasters.cuboids(buffer_indices >= 0):
+        box = tuple(slice(first, last + 1) for first, last in zip(start, end))
+        if buffer_indices[box].size < MIN_FILL_VOLUME:
+            continue
+
+        commands += fills.fill_commands(Coordinates(*(lower + start).tolist()), Coordinates(*(lower + end).tolist()),
+                                        state)
+        merged.append(buffer_indices[box].ravel())
+
+    return commands
@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import time
+from queue import Queue
+from threading import Thread
+
+import requests
+from gdpc import interface as INTF
+
+
+# Endpoint of the GDMC HTTP server placing blocks
+BLOCKS_URL = 'http://localhost:9000/blocks'
+
+# Endpoint of the GDMC HTTP server running commands
+COMMAND_URL = 'http://localhost:9000/command'
+
+# Maximum number of requests waiting to be sent, the simulation waits when it is reached
+QUEUE_SIZE = 4
+
+# Number of times a request is sent before being kept as failed, the waiting time doubling after each failure
+RETRIES = 5
+
+# Time waited after the first failure to send a request, in seconds
+BACKOFF = .5
+
+# Requests waiting to be sent by the sender thread, as commands and blocks with their placement flags
+_requests: Queue = Queue(QUEUE_SIZE)
+
+# Requests that could not be sent, followed by the ones queued after them, kept in order until the next flush
+_failed: list[tuple[list[str], list[tuple[int, int, int, str]], tuple[bool, str | None]]] = []
+
+# Thread sending the requests in the background, started with the first request
+_thread: Thread | None = None
+
+
+def submit(commands: list[str], blocks: list[tuple[int, int, int, str]] = None,
+           flags: tuple[bool, str | None] = (True, None)) -> None:
+    """Queue the given [commands], then the [blocks] given as x, y, z and state, to be sent in the background
+    in the order they were submitted. Wait if too many requests are already queued"""
+    global _thread
+
+    if _thread is None or not _thread.is_alive():
+        _thread = Thread(target=_run, name='block-sender', daemon=True)
+        _thread.start()
+
+    _requests.put((commands, blocks or [], flags))
+
+
+def flush() -> None:
+    """Send the blocks waiting in the buffer and wait until every queued request has been sent. Must be called
+    before anything relying on the blocks being in the world, like reading the world or merging block data.
+    Requests kept after a failure are tried again, and an exception is raised if they fail again"""
+    INTF.sendBlocks()
+    _requests.join()
+
+    if _failed:
+        # The sender thread is idle, so the failed requests can be queued again in the same order
+        failed = list(_failed)
+        _failed.clear()
+        for request in failed:
+            _requests.put(request)
+        _requests.join()
+
+    if _failed:
+        amount = sum(len(blocks) for _, blocks, _ in _failed)
+        raise Exception(f'Could not send {len(_failed)} requests placing {amount} blocks to the server')
+
+
+def _run() -> None:
+    """Send the queued requests one by one, forever. Once a request has failed, the following ones are kept
+    without being sent, so that they are not placed before it"""
+    while True:
+        request = _requests.get()
+
+        try:
+            if _failed:
+                _failed.append(request)
+            elif remaining := _send(*request):
+                _failed.append(remaining)
+        finally:
+            _requests.task_done()
+
+
+def _send(commands: list[str], blocks: list[tuple[int, int, int, str]],
+          flags: tuple[bool, str | None]) -> tuple[list[str], list[tuple[int, int, int, str]], tuple[bool, str | None]] | None:
+    """Run the given [commands] in a single request, then place the [blocks] in another one. Failing requests
+    are tried again after waiting longer and longer. Return the part of the request that could not be sent,
+    or None if everything was sent"""
+    block_updates, custom_flags = flags
+    parameters = {'customFlags': custom_flags} if custom_flags is not None else {'doBlockUpdates': block_updates}
+
+    for attempt in range(RETRIES):
+        try:
+            if commands:
+                requests.post(COMMAND_URL, bytes('\n'.join(commands), 'utf-8')).raise_for_status()
+                commands = []
+
+            if blocks:
+                body = '\n'.join(f'~{x} ~{y} ~{z} {block}' for x, y, z, block in blocks)
+                response = requests.put(BLOCKS_URL, body, params={'x': 0, 'y': 0, 'z': 0, **parameters})
+                response.raise_for_status()
+
+                if not all(value.isnumeric() for value in response.text.split('\n')):
+                    raise requests.RequestException(f'server returned an error: {response.text}')
+
+            return None
+        except requests.RequestException as error:
+            print(f'Warning: could not send the blocks to the server ({attempt + 1}/{RETRIES}): {error}')
+            if attempt < RETRIES - 1:
+                time.sleep(BACKOFF * 2 ** attempt)
+
+    return commands, blocks, flags
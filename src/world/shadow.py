@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+from random import choice
+
+import numpy as np
+from gdpc import interface as INTF
+
+from src import env
+from src.utils.coordinates import Coordinates
+from src.world import chunks, placements, sender
+
+
+class ShadowInterface(INTF.Interface):
+    """GDPC interface writing every placed block through to the local copy of the world, the env.VOXELS
+    grid and env.HEIGHTMAPS, before placing it in the world. Reads made after building are then up to date
+    without fetching the world again"""
+
+    def __init__(self, *args, **kwargs):
+        """Parameterised constructor creating a new shadow interface, whose buffer maps the global coordinates
+        of the blocks to place to their state. Only the last state written at each coordinates is sent"""
+        super().__init__(*args, **kwargs)
+        self.buffer: dict[tuple[int, int, int], str] = {}
+        self.redundant_writes = 0
+        self.unchanged_writes = 0
+
+    def placeBlock(self, x: int, y: int, z: int, block: str | list[str], replace: str | list[str] = None,
+                   doBlockUpdates: bool = -1, customFlags: str = -1) -> str:
+        """Place the given [block] at the x, y, z coordinates, or a random one if a sequence is given. Blocks
+        already found at these coordinates in the local copy of the world are not placed again. If [replace]
+        is given, the block is only placed over the given blocks, read from the world like GDPC does"""
+        if not isinstance(block, str):
+            block = choice(block)
+
+        if replace is not None:
+            # The block found is read once, here, so that the placement is known to the local copy
+            current = self.getBlock(x, y, z)
+            if current != replace if isinstance(replace, str) else current not in replace:
+                return '0'
+
+        if is_already_placed(*self.local2global(x, y, z), block):
+            self.unchanged_writes += 1
+            return '0'
+
+        write_block(*self.local2global(x, y, z), block)
+        return super().placeBlock(x, y, z, block, None, doBlockUpdates, customFlags)
+
+    def placeBlockBuffered(self, x: int, y: int, z: int, blockStr: str, limit: int = 50,
+                           doBlockUpdates: bool = -1, customFlags: str = -1) -> str:
+        """Add the given block to the buffer, replacing the one waiting at the same x, y, z coordinates if any,
+        and send the buffer once its [limit] is reached"""
+        flags = (self.placeBlockflags[0] if doBlockUpdates == -1 else doBlockUpdates,
+                 self.placeBlockflags[1] if customFlags == -1 else customFlags)
+
+        if flags != self.bufferblockflags:
+            self.sendBlocks()
+            self.bufferblockflags = flags
+
+        coordinates = tuple(int(value) for value in self.local2global(x, y, z))
+        if coordinates in self.buffer:
+            # The replaced block is removed so that the new one is placed after the blocks added in between
+            del self.buffer[coordinates]
+            self.redundant_writes += 1
+
+        self.buffer[coordinates] = blockStr
+        return self.sendBlocks() if len(self.buffer) >= limit else '0'
+
+    def getBlock(self, x: int, y: int, z: int) -> str:
+        """Return the block found at the x, y, z coordinates of the world, once every block sent is placed"""
+        sender.flush()
+        return super().getBlock(x, y, z)
+
+    def setBuffering(self, value: bool, notify: bool = True) -> None:
+        """Activate or deactivate the buffer. Blocks placed directly must not overtake the ones still queued,
+        so deactivating the buffer waits until every block sent is placed"""
+        super().setBuffering(value, notify)
+        if not value:
+            sender.flush()
+
+    def sendBlocks(self, x: int = 0, y: int = 0, z: int = 0, retries: int = 5) -> str:
+        """Queue the buffer to be sent to the server in the background and clear it. Cuboids of identical
+        blocks are sent as fill commands, which always update the neighbouring blocks, and the other blocks
+        are placed one by one. Requests that could not be sent are kept by the sender until the next flush"""
+        blocks = [(*coordinates, block) for coordinates, block in self.buffer.items()]
+        self.buffer = {}
+
+        commands = []
+        if blocks and placements.updates_neighbours(self.bufferblockflags):
+            commands, blocks = placements.compress(blocks)
+
+        if commands or blocks:
+            sender.submit(commands, blocks, self.bufferblockflags)
+        return '0'
+
+
+def install() -> None:
+    """Replace the global GDPC interface with a shadow interface keeping the same settings"""
+    previous = INTF.globalinterface
+    if isinstance(previous, ShadowInterface):
+        return
+
+    previous.sendBlocks()
+    INTF.globalinterface = ShadowInterface(buffering=previous.isBuffering(), bufferlimit=previous.bufferlimit)
+    INTF.globalinterface.placeBlockflags = previous.placeBlockflags
+
+
+def is_already_placed(x: int, y: int, z: int, block: str) -> bool:
+    """Return true if the given [block] is the one at the x, y, z coordinates of the local copy of the world.
+    Blocks with data tags and blocks outside of the voxel grid are never considered already placed"""
+    x, y, z = int(x), int(y), int(z)
+
+    if env.VOXELS is None or '{' in block or not env.VOXELS.contains(x, y, z):
+        return False
+    return env.VOXELS.get_id(x, y, z) == env.VOXELS.index_of(block)
+
+
+def write_block(x: int, y: int, z: int, block: str) -> None:
+    """Write the given [block] at the x, y, z coordinates of the local copy of the world. Blocks outside of
+    the voxel grid are ignored"""
+    x, y, z = int(x), int(y), int(z)
+    chunks.invalidate(x, z)
+
+    if env.VOXELS is not None and env.VOXELS.contains(x, y, z):
+        env.VOXELS.set_block(x, y, z, block)
+        env.HEIGHTMAPS.record(x - env.VOXELS.origin.x, y, z - env.VOXELS.origin.z)
+
+
+def write_mask(origin: Coordinates, mask: np.ndarray, block: str) -> None:
+    """Write the given [block] in the cells of the 3D [mask], indexed as [x, y, z] relatively to the [origin]
+    coordinates, in the local copy of the world. Cells outside of the voxel grid are ignored"""
+    x, _, z = np.nonzero(mask)
+    for chunk_x, chunk_z in set(zip(((x + origin.x) >> 4).tolist(), ((z + origin.z) >> 4).tolist())):
+        chunks.invalidate(chunk_x << 4, chunk_z << 4)
+
+    if env.VOXELS is not None:
+        env.HEIGHTMAPS.record(*env.VOXELS.fill(origin, mask, block))
@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import numpy as np
+from gdpc.worldLoader import WorldSlice
+from nbt.nbt import TAG_Compound
+
+from src.blocks.block import Block
+from src.blocks.utils.block_properties import BlockProperties
+from src.utils.coordinates import Coordinates
+
+
+# Number of blocks on each side of a chunk section
+SECTION_SIZE = 16
+
+# Height of the world, in blocks
+WORLD_HEIGHT = 256
+
+
+class VoxelGrid:
+    """Dense representation of the blocks of a world slice. Each voxel stores the index of its
+    block state in a palette shared by the whole grid, voxels are indexed as [x, y, z] relatively
+    to the [origin] of the grid. Block objects are only created when a caller asks for one"""
+
+    def __init__(self, origin: Coordinates, ids: np.ndarray, palette: list[str]):
+        """Parameterised constructor creating a new grid from the given block state [ids] and
+        [palette], whose first voxel is located at the given [origin] coordinates"""
+        self.origin = origin
+        self.ids = ids
+        self.palette: list[str] = []
+
+        self.__indices: dict[str, int] = {}
+        self.__names: list[str] = []
+        self.__properties: list[BlockProperties | None] = []
+        self.__matches: dict[tuple[tuple[str, ...], bool], np.ndarray] = {}
+
+        for state in palette:
+            self.index_of(state)
+
+    @staticmethod
+    def from_world_slice(world: WorldSlice) -> VoxelGrid:
+        """Return a new voxel grid built from the chunk sections of the given [world] slice.
+        Sections missing from the slice are considered to be full of air"""
+        x, z, size_x, size_z = world.rect
+        grid = VoxelGrid(Coordinates(x, 0, z), np.zeros((size_x, WORLD_HEIGHT, size_z), dtype=np.uint16),
+                         ['minecraft:air'])
+
+        for chunk_x, column in enumerate(world.sections):
+            for chunk_z, sections in enumerate(column):
+                start_x = (world.chunkRect[0] + chunk_x) * SECTION_SIZE - x
+                start_z = (world.chunkRect[1] + chunk_z) * SECTION_SIZE - z
+
+                # Part of the chunk that lies inside of the world slice
+                min_x, max_x = max(start_x, 0), min(start_x + SECTION_SIZE, size_x)
+                min_z, max_z = max(start_z, 0), min(start_z + SECTION_SIZE, size_z)
+
+                for chunk_y, section in enumerate(sections):
+                    if section is None:
+                        continue
+
+                    states = np.array([grid.index_of(_parse_state(entry)) for entry in section.palette], dtype=np.uint16)
+                    bit_array = section.blockStatesBitArray
+
+                    # Sections are stored in y, z, x order
+                    indices = _unpack(bit_array.longArray, bit_array.bitsPerEntry)
+                    voxels = states[indices].reshape((SECTION_SIZE,) * 3).transpose(2, 0, 1)
+
+                    y = chunk_y * SECTION_SIZE
+                    grid.ids[min_x:max_x, y:y + SECTION_SIZE, min_z:max_z] = \
+                        voxels[min_x - start_x:max_x - start_x, :, min_z - start_z:max_z - start_z]
+
+        return grid
+
+    def index_of(self, state: str) -> int:
+        """Return the index of the given block [state] in the palette, adding it if necessary. States are
+        compared once namespaced, with sorted properties and without block entity data"""
+        if state in self.__indices:
+            return self.__indices[state]
+
+        normalized = _normalize_state(state)
+        if normalized not in self.__indices:
+            self.__indices[normalized] = len(self.palette)
+            self.palette.append(normalized)
+            self.__names.append(normalized.split('[')[0])
+            self.__properties.append(None)
+
+        self.__indices[state] = self.__indices[normalized]
+        return self.__indices[state]
+
+    def contains(self, x: int, y: int, z: int) -> bool:
+        """Return true if the given x, y, z coordinates are inside of the grid"""
+        size_x, size_y, size_z = self.ids.shape
+        return 0 <= x - self.origin.x < size_x and 0 <= y < size_y and 0 <= z - self.origin.z < size_z
+
+    def get_id(self, x: int, y: int, z: int) -> int:
+        """Return the index in the palette of the block state found at the given x, y, z coordinates.
+        Raise an IndexError if the coordinates are outside of the grid"""
+        if not self.contains(x, y, z):
+            raise IndexError(f'Coordinates ({x}, {y}, {z}) are outside of the voxel grid')
+        return int(self.ids[x - self.origin.x, y, z - self.origin.z])
+
+    def get_name(self, x: int, y: int, z: int) -> str:
+        """Return the full block state found at the given x, y, z coordinates"""
+        return self.palette[self.get_id(x, y, z)]
+
+    def get_block(self, x: int, y: int, z: int) -> Block:
+        """Return a new block object representing the block found at the given x, y, z coordinates.
+        The properties of a block state are parsed once and shared by all the blocks using them"""
+        index = self.get_id(x, y, z)
+
+        if self.__properties[index] is None:
+            self.__properties[index] = Block.deserialize(self.palette[index], None).properties
+
+        return Block(self.__names[index], Coordinates(x, y, z), self.__properties[index])
+
+    def set_block(self, x: int, y: int, z: int, state: str) -> None:
+        """Replace the block found at the given x, y, z coordinates with the given block [state].
+        Raise an IndexError if the coordinates are outside of the grid"""
+        if not self.contains(x, y, z):
+            raise IndexError(f'Coordinates ({x}, {y}, {z}) are outside of the voxel grid')
+        self.ids[x - self.origin.x, y, z - self.origin.z] = self.index_of(state)
+
+    def fill(self, origin: Coordinates, mask: np.ndarray, state: str) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Replace the blocks corresponding to the true cells of the 3D [mask], indexed as [x, y, z] relatively
+        to the [origin] coordinates, with the given block [state]. Cells outside of the grid are ignored.
+        Return the x, y, z indices in the grid of the replaced blocks"""
+        x, y, z = np.nonzero(mask)
+        x, y, z = x + (origin.x - self.origin.x), y + origin.y, z + (origin.z - self.origin.z)
+
+        size_x, size_y, size_z = self.ids.shape
+        inside = (0 <= x) & (x < size_x) & (0 <= y) & (y < size_y) & (0 <= z) & (z < size_z)
+        x, y, z = x[inside], y[inside], z[inside]
+
+        self.ids[x, y, z] = self.index_of(state)
+        return x, y, z
+
+    def matching(self, pattern: str | tuple[str, ...], *, exact: bool = False) -> np.ndarray:
+        """Return a boolean array telling, for each block state of the palette, if its name contains
+        the given [pattern]. The semantics are the same as the Block.is_one_of method, unless [exact]
+        is true, in which case the names must be equal to one of the parts of the pattern"""
+        if type(pattern) == str:
+            pattern = (pattern, )
+        key = (tuple(pattern), exact)
+
+        matches = self.__matches.get(key)
+        if matches is None or len(matches) != len(self.palette):
+            if exact:
+                matches = np.array([name in key[0] for name in self.__names], dtype=bool)
+            else:
+                matches = np.array([any(part in name for part in key[0]) for name in self.__names], dtype=bool)
+            self.__matches[key] = matches
+
+        return matches
+
+    def mask(self, pattern: str | tuple[str, ...]) -> np.ndarray:
+        """Return a boolean volume of the size of the grid, true where the name of the block contains
+        the given [pattern]"""
+        return self.matching(pattern)[self.ids]
+
+
+def _parse_state(entry: TAG_Compound) -> str:
+    """Return the block state string corresponding to the given section palette [entry]"""
+    name = entry['Name'].value
+
+    if 'Properties' not in entry.keys():
+        return name
+
+    properties = ', '.join(f'{key}={value.value}' for key, value in entry['Properties'].iteritems())
+    return f'{name}[{properties}]'
+
+
+def _normalize_state(state: str) -> str:
+    """Return the given block [state] namespaced, with sorted properties and without block entity data"""
+    name, _, properties = state.split('{')[0].partition('[')
+    name = name.strip() if ':' in name else f'minecraft:{name.strip()}'
+
+    properties = sorted(part.strip() for part in properties.rstrip('] ').split(',') if part.strip())
+    return f'{name}[{", ".join(properties)}]' if properties else name
+
+
+def _unpack(longs: list[int], bits: int) -> np.ndarray:
+    """Return the indices packed into the given [longs], each of them using [bits] bits. Indices
+    never overlap two longs, as it is the case since minecraft 1.16"""
+    data = np.array(longs, dtype=np.int64).view(np.uint64)
+    per_long = 64 // bits
+
+    positions = np.arange(SECTION_SIZE ** 3)
+    shifts = ((positions % per_long) * bits).astype(np.uint64)
+
+    return ((data[positions // per_long] >> shifts) & np.uint64((1 << bits) - 1)).astype(np.intp)